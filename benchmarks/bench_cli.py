@@ -0,0 +1,77 @@
+import contextlib
+import io
+import json
+import os
+import shutil
+import tempfile
+
+from dictsdiff.cli import main
+
+from .common import make_dicts
+
+
+class CLI(object):
+    params = ([100, 1000], ['json', 'yaml'])
+    param_names = ['nfiles', 'format']
+
+    def setup(self, nfiles, format):
+        import yaml
+        dicts = make_dicts(nfiles, 100, depth=3, dtypes='mixed',
+                           diff_fraction=0.05)
+        self.tmpdir = tempfile.mkdtemp()
+        self.files = []
+        for i, dct in enumerate(dicts):
+            path = os.path.join(self.tmpdir, '{}.{}'.format(i, format))
+            with open(path, 'w') as file:
+                if format == 'json':
+                    json.dump(dct, file)
+                else:
+                    yaml.safe_dump(dct, file)
+            self.files.append(path)
+        self.ndjson = os.path.join(self.tmpdir, 'all.ndjson')
+        with open(self.ndjson, 'w') as file:
+            for dct in dicts:
+                file.write(json.dumps(dct) + '\n')
+
+    def teardown(self, nfiles, format):
+        shutil.rmtree(self.tmpdir)
+
+    def run(self, args):
+        with contextlib.redirect_stdout(io.StringIO()):
+            main(args)
+
+    def time_files(self, nfiles, format):
+        self.run(self.files)
+
+    def time_ndjson(self, nfiles, format):
+        self.run(['--ndjson', self.ndjson])
+
+
+class TableOutput(object):
+    params = [10000, 200000]
+    param_names = ['nrows']
+
+    def setup(self, nrows):
+        from dictsdiff import diff_dicts
+        dicts = make_dicts(nrows, 10, dtypes='mixed')
+        self.pdiff = diff_dicts(dicts).pretty_diff()
+        self.devnull = open(os.devnull, 'w')
+
+    def teardown(self, nrows):
+        self.devnull.close()
+
+    def time_write_table(self, nrows):
+        from dictsdiff.output import write_table
+        write_table(self.pdiff, self.devnull, width=80)
+
+    def peakmem_write_table(self, nrows):
+        from dictsdiff.output import write_table
+        write_table(self.pdiff, self.devnull, width=80)
+
+    def time_print(self, nrows):
+        # What the CLI did before `write_table`:
+        import pandas
+        with pandas.option_context('display.max_rows', None,
+                                   'display.max_columns', None,
+                                   'display.width', 80):
+            str(self.pdiff)
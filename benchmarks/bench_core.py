@@ -0,0 +1,169 @@
+import random
+
+import pandas
+
+from dictsdiff.core import diff_dicts, diff_keys, dicts_to_dataframe, \
+    different_keys, flatten_dict, force_tuple_columns, iteritemsdeep
+
+from .common import make_dicts
+
+
+def legacy_dicts_to_dataframe(dicts):
+    # `dicts_to_dataframe` before the columnar builder was introduced;
+    # kept as the reference point for the benchmarks below.
+    df = pandas.DataFrame.from_dict([flatten_dict(d) for d in dicts])
+    force_tuple_columns(df)
+    return df
+
+
+class IterItemsDeep(object):
+    params = ([10, 1000], [1, 4])
+    param_names = ['nkeys', 'depth']
+
+    def setup(self, nkeys, depth):
+        self.dicts = make_dicts(1000, nkeys, depth=depth, dtypes='mixed')
+
+    def time_iteritemsdeep(self, nkeys, depth):
+        for d in self.dicts:
+            for _ in iteritemsdeep(d):
+                pass
+
+
+class DictsToDataFrame(object):
+    params = ([1000, 100000], [10, 100])
+    param_names = ['nrecords', 'nkeys']
+
+    def setup(self, nrecords, nkeys):
+        self.dicts = make_dicts(nrecords, nkeys)
+
+    def time_dicts_to_dataframe(self, nrecords, nkeys):
+        dicts_to_dataframe(self.dicts)
+
+    def peakmem_dicts_to_dataframe(self, nrecords, nkeys):
+        dicts_to_dataframe(self.dicts)
+
+    def time_legacy_dicts_to_dataframe(self, nrecords, nkeys):
+        legacy_dicts_to_dataframe(self.dicts)
+
+    def peakmem_legacy_dicts_to_dataframe(self, nrecords, nkeys):
+        legacy_dicts_to_dataframe(self.dicts)
+
+
+class DifferentKeys(object):
+    params = (['int', 'float', 'str', 'none', 'list', 'mixed'], [0.0, 0.1])
+    param_names = ['dtypes', 'diff_fraction']
+
+    def setup(self, dtypes, diff_fraction):
+        self.df = dicts_to_dataframe(make_dicts(
+            10000, 100, dtypes=dtypes, diff_fraction=diff_fraction))
+
+    def time_different_keys(self, dtypes, diff_fraction):
+        list(different_keys(self.df))
+
+    def time_different_keys_tol(self, dtypes, diff_fraction):
+        list(different_keys(self.df, rtol=1e-6))
+
+
+class WideFloats(object):
+    params = [1000, 50000]
+    param_names = ['nkeys']
+
+    def setup(self, nkeys):
+        dicts = make_dicts(100, nkeys, dtypes='float', diff_fraction=0.0)
+        self.dd = diff_dicts(dicts)
+        self.builder = self.dd._values
+        self.df = self.builder.to_dataframe()
+
+    def time_builder_different_keys_tol(self, nkeys):
+        self.builder.different_keys(rtol=1e-6)
+
+    def time_different_keys_tol(self, nkeys):
+        list(different_keys(self.df, rtol=1e-6))
+
+
+class DiffDicts(object):
+    params = ([1000, 10000], [2, 4], [0.01, 0.5])
+    param_names = ['nrecords', 'depth', 'diff_fraction']
+
+    def setup(self, nrecords, depth, diff_fraction):
+        self.dicts = make_dicts(nrecords, 200, depth=depth, dtypes='mixed',
+                                diff_fraction=diff_fraction)
+        self.dd = diff_dicts(self.dicts)
+
+    def time_diff_dicts(self, nrecords, depth, diff_fraction):
+        diff_dicts(self.dicts)
+
+    def peakmem_diff_dicts(self, nrecords, depth, diff_fraction):
+        diff_dicts(self.dicts)
+
+    def time_pretty_diff(self, nrecords, depth, diff_fraction):
+        self.dd.pretty_diff()
+
+    def time_diff_keys(self, nrecords, depth, diff_fraction):
+        diff_keys(self.dicts)
+
+    def peakmem_diff_keys(self, nrecords, depth, diff_fraction):
+        diff_keys(iter(self.dicts))
+
+
+class Prune(object):
+    # Large documents which are mostly identical:
+    params = ([False, True], [0.0, 0.001])
+    param_names = ['prune', 'diff_fraction']
+
+    def setup(self, prune, diff_fraction):
+        self.dicts = make_dicts(300, 5000, depth=3, dtypes='mixed',
+                                diff_fraction=diff_fraction)
+
+    def time_diff_dicts(self, prune, diff_fraction):
+        diff_dicts(self.dicts, prune=prune).keys
+
+    def peakmem_diff_dicts(self, prune, diff_fraction):
+        diff_dicts(self.dicts, prune=prune).keys
+
+
+class Sparse(object):
+    # Wide records each having a small subset of the keys:
+    params = [False, True]
+    param_names = ['sparse']
+
+    def setup(self, sparse):
+        rng = random.Random(0)
+        self.dicts = [
+            {'k{}'.format(i): rng.randrange(1000)
+             for i in rng.sample(range(20000), 200)}
+            for _ in range(2000)]
+
+    def time_value_df(self, sparse):
+        diff_dicts(self.dicts, sparse=sparse).value_df
+
+    def peakmem_value_df(self, sparse):
+        diff_dicts(self.dicts, sparse=sparse).value_df
+
+
+class Summary(object):
+    # Thousands of different keys:
+    params = ['int', 'str', 'mixed']
+    param_names = ['dtypes']
+
+    def setup(self, dtypes):
+        self.dd = diff_dicts(make_dicts(10000, 2000, dtypes=dtypes))
+        self.dd.diff_df
+
+    def time_summary(self, dtypes):
+        self.dd.summary()
+
+
+class Groups(object):
+    # Many records in a few dozen distinct configurations:
+    params = ['int', 'str', 'mixed']
+    param_names = ['dtypes']
+
+    def setup(self, dtypes):
+        configs = make_dicts(30, 50, dtypes=dtypes)
+        rng = random.Random(0)
+        self.dd = diff_dicts([rng.choice(configs) for _ in range(100000)])
+        self.dd.diff_df
+
+    def time_groups(self, dtypes):
+        self.dd.groups()
@@ -0,0 +1,84 @@
+import io
+import json
+import os
+import tempfile
+
+from dictsdiff.loader import JSON_BACKENDS, diff_ndjson, diff_ndjson_file, \
+    diff_table_file, get_json_backend, scan_ndjson_file_keys
+
+from .common import make_dicts
+
+
+class JSONBackends(object):
+    params = (list(JSON_BACKENDS),)
+    param_names = ['backend']
+
+    def setup(self, backend):
+        try:
+            self.loads = get_json_backend(backend).loads
+        except Exception:
+            raise NotImplementedError('{} is not installed'.format(backend))
+        dicts = make_dicts(10000, 100, depth=3, dtypes='mixed',
+                           diff_fraction=0.1)
+        self.lines = [json.dumps(d).encode('utf-8') for d in dicts]
+        self.ndjson = b'\n'.join(self.lines)
+
+    def time_loads(self, backend):
+        for line in self.lines:
+            self.loads(line)
+
+    def time_diff_ndjson(self, backend):
+        diff_ndjson(io.BytesIO(self.ndjson), json_backend=backend)
+
+
+class NDJSONFile(object):
+    params = ([1, 2, 4],)
+    param_names = ['jobs']
+    timeout = 120
+
+    def setup(self, jobs):
+        dicts = make_dicts(100000, 20, depth=2, dtypes='mixed',
+                           diff_fraction=0.1)
+        fd, self.path = tempfile.mkstemp(suffix='.ndjson')
+        with os.fdopen(fd, 'w') as file:
+            for d in dicts:
+                file.write(json.dumps(d) + '\n')
+
+    def teardown(self, jobs):
+        os.remove(self.path)
+
+    def time_diff_ndjson_file(self, jobs):
+        diff_ndjson_file(self.path, jobs=jobs).keys
+
+    def time_scan_ndjson_file_keys(self, jobs):
+        scan_ndjson_file_keys(self.path, jobs=jobs)
+
+
+class TableFile(object):
+    # The same records as NDJSONFile but in CSV:
+    params = ([None, 2],)
+    param_names = ['ncolumns']
+    timeout = 120
+
+    def setup(self, ncolumns):
+        import pandas
+        from dictsdiff.core import flatten_dict
+        from dictsdiff.output import encode_objects
+        dicts = make_dicts(100000, 20, depth=2, dtypes='mixed',
+                           diff_fraction=0.1)
+        df = pandas.DataFrame([
+            {'.'.join(k): v for (k, v) in flatten_dict(d).items()}
+            for d in dicts])
+        fd, self.path = tempfile.mkstemp(suffix='.csv')
+        os.close(fd)
+        encode_objects(df).to_csv(self.path, index=False)
+        self.columns = None
+        if ncolumns:
+            self.columns = [tuple(name.split('.'))
+                            for name in df.columns[:ncolumns]]
+
+    def teardown(self, ncolumns):
+        os.remove(self.path)
+
+    def time_diff_table_file(self, ncolumns):
+        diff_table_file(self.path, columns=self.columns).keys
@@ -0,0 +1,93 @@
+"""
+Synthetic data for the benchmarks.
+"""
+
+import json
+import random
+
+VALUE_MAKERS = {
+    'int': lambda rng: rng.randrange(1000),
+    'float': lambda rng: rng.random(),
+    'str': lambda rng: 'value{}'.format(rng.randrange(1000)),
+    'bool': lambda rng: rng.random() < 0.5,
+    'none': lambda rng: None,
+    'list': lambda rng: [rng.randrange(10) for _ in range(3)],
+}
+
+DTYPE_MIXES = {
+    'int': ['int'],
+    'float': ['float'],
+    'str': ['str'],
+    'none': ['none'],
+    'list': ['list'],
+    'mixed': ['int', 'float', 'str', 'bool', 'none', 'list'],
+}
+
+
+def key_path(i, depth):
+    """
+    Path to `i`-th leaf in a tree with branching factor 8.
+
+    >>> key_path(10, 3)
+    ('n2', 'n1', 'k10')
+
+    """
+    return tuple('n{}'.format((i >> (3 * level)) % 8)
+                 for level in range(depth - 1)) + ('k{}'.format(i),)
+
+
+def set_deep(dct, path, value):
+    for key in path[:-1]:
+        dct = dct.setdefault(key, {})
+    dct[path[-1]] = value
+
+
+def make_dicts(nrecords, nkeys, depth=1, dtypes='int', diff_fraction=1.0,
+               seed=0):
+    """
+    Generate `nrecords` nested dictionaries.
+
+    Parameters
+    ----------
+    nrecords : int
+    nkeys : int
+        Number of leaves in each dictionary.
+    depth : int
+        Nesting depth of the leaves.
+    dtypes : str
+        A key of `DTYPE_MIXES`.  Value types are assigned to the
+        leaves in turn.
+    diff_fraction : float
+        Fraction of the leaves whose values vary across records.  The
+        other leaves have the same value in all records.
+    seed : int
+
+    >>> dicts = make_dicts(3, 4, depth=2, dtypes='mixed', diff_fraction=0.5)
+    >>> len(dicts)
+    3
+    >>> sorted(dicts[0])
+    ['n0', 'n1', 'n2', 'n3']
+    >>> dicts[0]['n3']
+    {'k3': True}
+    >>> dicts[0]['n3'] == dicts[1]['n3']
+    True
+
+    """
+    rng = random.Random(seed)
+    makers = [VALUE_MAKERS[name] for name in DTYPE_MIXES[dtypes]]
+    makers = [makers[i % len(makers)] for i in range(nkeys)]
+    paths = [key_path(i, depth) for i in range(nkeys)]
+    ndiff = int(round(nkeys * diff_fraction))
+    base = [make(rng) for make in makers]
+
+    dicts = []
+    for _ in range(nrecords):
+        values = [make(rng) for make in makers[:ndiff]] + base[ndiff:]
+        dct = {}
+        for path, value in zip(paths, values):
+            set_deep(dct, path, value)
+        dicts.append(dct)
+
+    # Round-trip through JSON so that equal values are distinct
+    # objects, as if they were loaded from files:
+    return json.loads(json.dumps(dicts))
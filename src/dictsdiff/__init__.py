@@ -67,6 +67,17 @@ path
 1  2    1
 
 
+`dictsdiff.diff_keys`
+^^^^^^^^^^^^^^^^^^^^^
+
+>>> from dictsdiff import diff_keys
+>>> diff_keys([
+...     {'a': 1, 'b': {'c': 0, 'd': 0}},
+...     {'a': 2, 'b': {'c': 0, 'd': 1}},
+... ])
+[('a',), ('b', 'd')]
+
+
 Installation
 ------------
 ::
@@ -82,11 +93,17 @@ Requirements
 - PyYAML_ (optional)
 - toml_ (optional)
 - jsonpath-rw_ (optional)
+- orjson_, pysimdjson_ or ujson_ (optional; for faster JSON decoding)
+- pyarrow_ (optional; for Parquet and Arrow input and output)
 
 .. _pandas: http://pandas.pydata.org
 .. _PyYAML: http://pyyaml.org/wiki/PyYAML
 .. _toml: https://github.com/uiri/toml
 .. _jsonpath-rw: https://github.com/kennknowles/python-jsonpath-rw
+.. _orjson: https://github.com/ijl/orjson
+.. _pysimdjson: https://github.com/TkTech/pysimdjson
+.. _ujson: https://github.com/ultrajson/ultrajson
+.. _pyarrow: https://arrow.apache.org/docs/python/
 
 .. |pypi|
    image:: https://badge.fury.io/py/dictsdiff.svg
@@ -108,5 +125,5 @@ __version__ = '0.1.1'
 __author__ = 'Takafumi Arakaki'
 __license__ = 'BSD-2-Clause'
 
-from .core import diff_dicts
+from .core import diff_dicts, diff_keys
 from .loader import diff_files, diff_ndjson
@@ -0,0 +1,174 @@
+"""
+On-disk cache of the flattened records loaded from files.
+"""
+
+import hashlib
+import os
+import pickle
+
+CACHE_VERSION = 3
+
+
+def default_cache_dir():
+    """
+    Return ``$XDG_CACHE_HOME/dictsdiff`` (``~/.cache/dictsdiff`` by default).
+    """
+    base = os.environ.get('XDG_CACHE_HOME') or \
+        os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'dictsdiff')
+
+
+def file_digest(path, blocksize=2 ** 20):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(blocksize), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class LoadCache(object):
+    """
+    Cache of the flattened records loaded from files.
+
+    The records are the lists returned (for each JSONPath) by
+    `.loader.load_flat_file_records`.
+
+    An entry is stored for each combination of an absolute file path,
+    a JSONPath and the name of the JSON backend (see
+    `.loader.get_json_backend`) since the backends may decode numbers
+    differently.  It is valid while the modification time and the size
+    of the file are unchanged.  When only the modification time is
+    changed (e.g., by ``touch``), the content hash recorded in the
+    entry is checked so that the entry can be reused.
+
+    Entries are evicted by `evict` in least-recently-used order when
+    their total size exceeds `max_size` bytes.
+
+    Parameters
+    ----------
+    directory : str or None
+        Defaults to `default_cache_dir`.
+    max_size : int
+        Upper bound of the total size of the entries in bytes.
+
+    """
+
+    suffix = '.pickle'
+
+    def __init__(self, directory=None, max_size=256 * 2 ** 20):
+        self.directory = directory or default_cache_dir()
+        self.max_size = max_size
+
+    def entry_path(self, filepath, jspath=None, backend=None):
+        key = repr((os.path.abspath(filepath), jspath, backend)) \
+            .encode('utf-8')
+        name = hashlib.sha1(key).hexdigest() + self.suffix
+        return os.path.join(self.directory, name)
+
+    def get(self, filepath, jspath=None, backend=None):
+        """
+        Return the cached records or `None` if not cached.
+        """
+        entry_path = self.entry_path(filepath, jspath, backend)
+        try:
+            stat = os.stat(filepath)
+            with open(entry_path, 'rb') as file:
+                entry = pickle.load(file)
+        except Exception:
+            # Not cached, or a broken entry which `put` overwrites.
+            return None
+        if entry.get('version') != CACHE_VERSION or \
+                entry['size'] != stat.st_size:
+            return None
+        if entry['mtime'] != stat.st_mtime_ns:
+            if entry['digest'] != file_digest(filepath):
+                return None
+            self._write(entry_path, dict(entry, mtime=stat.st_mtime_ns))
+        else:
+            try:
+                os.utime(entry_path)  # mark as recently used
+            except (OSError, IOError):
+                pass
+        return entry['records']
+
+    def put(self, filepath, jspath, records, stat, backend=None):
+        """
+        Store `records` loaded from `filepath`.
+
+        `stat` is the result of `os.stat` taken *before* loading the
+        file.  Nothing is stored if the file has been modified since.
+        """
+        digest = file_digest(filepath)
+        if not same_stat(stat, os.stat(filepath)):
+            return
+        self._write(self.entry_path(filepath, jspath, backend), dict(
+            version=CACHE_VERSION,
+            mtime=stat.st_mtime_ns,
+            size=stat.st_size,
+            digest=digest,
+            records=records,
+        ))
+
+    def _write(self, entry_path, entry):
+        # Write to a temporary file first so that concurrent readers
+        # never see a partially written entry:
+        tmppath = '{}.{}.tmp'.format(entry_path, os.getpid())
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(tmppath, 'wb') as file:
+                pickle.dump(entry, file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmppath, entry_path)
+        except (OSError, IOError):
+            # As in `get`, a broken cache only makes it slower:
+            try:
+                os.remove(tmppath)
+            except (OSError, IOError):
+                pass
+
+    def evict(self):
+        """
+        Remove least recently used entries until they fit in `max_size`.
+        """
+        try:
+            names = os.listdir(self.directory)
+        except (OSError, IOError):
+            return
+        entries = []
+        for name in names:
+            if not name.endswith(self.suffix):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except (OSError, IOError):
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for (_, size, _) in entries)
+        for (_, size, path) in sorted(entries):
+            if total <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except (OSError, IOError):
+                pass
+            total -= size
+
+
+def same_stat(a, b):
+    return a.st_mtime_ns == b.st_mtime_ns and a.st_size == b.st_size
+
+
+def as_cache(cache):
+    """
+    Convert `cache` argument of `.diff_files` to a `LoadCache` or `None`.
+
+    `None` and `False` disable caching, `True` means the default
+    directory and a string specifies the directory.
+    """
+    if cache is None or cache is False:
+        return None
+    if cache is True:
+        return LoadCache()
+    if isinstance(cache, LoadCache):
+        return cache
+    return LoadCache(cache)
@@ -5,6 +5,7 @@ Usage::
 
   dictsdiff FILE [JSON_PATH] [FILE [JSON_PATH] ...]
   dictsdiff --ndjson=FILE.ndjson
+  dictsdiff --table=FILE.{csv,tsv,parquet,arrow} [--column=KEY ...]
   cat *.ndjson | dictsdiff [--ndjson=-]
 
 When paths to multiple files are given, it loads the dictionaries from
@@ -13,13 +14,20 @@ key-value pairs that are different or missing are shown in a table
 format.  A file path ``FILE`` may be followed by a JSONPath_
 ``JSON_PATH`` which starts with ``$.``.  If ``FILE`` starts with
 ``$.``, prepend ``./`` to ``FILE`` to disambiguate the argument.
-``JSON_PATH`` can be used for non-JSON files.
+``JSON_PATH`` can be used for non-JSON files.  With ``--expand``, each
+object found by ``JSON_PATH`` (e.g., ``'$.runs[*]'``) is compared as a
+separate dictionary.
 
 .. _JSONPath: http://goessner.net/articles/JsonPath/
 
 When no files are given, it is assumed that Newline delimited JSON
 (ndjson) is fed to the stdin.
 
+With ``--table``, each row of a CSV, TSV, Parquet or Arrow file is
+compared as a dictionary.  Dotted column names such as ``b.c`` (and
+the fields of Parquet/Arrow struct columns) are nested keys.  Use
+``--column`` to read only some of the columns.
+
 Examples
 ^^^^^^^^
 
@@ -29,16 +37,19 @@ Examples
    $ echo '{"a": 2, "b": {"c": 0, "d": 1, "e": 0}}' > 1.json
    $ echo '{"a": 2, "b": {"c": 0, "d": 1}}' > 2.json
    $ dictsdiff *.json
-           a  b.d  b.e
+           a  b.d   b.e
    path
-   0.json  1    0  0.0
-   1.json  2    1  0.0
-   2.json  2    1  NaN
+   0.json  1    0     0
+   1.json  2    1     0
+   2.json  2    1  <NA>
    $ cat *.json | dictsdiff
-      a  b.d  b.e
-   0  1    0  0.0
-   1  2    1  0.0
-   2  2    1  NaN
+      a  b.d   b.e
+   0  1    0     0
+   1  2    1     0
+   2  2    1  <NA>
+
+A missing key is shown as ``<NA>`` (or ``NaN`` in a column of floats
+or mixed types) so that integer columns are not converted to floats.
 
 If JSON files are pre-processed by jq_, dictsdiff can handle its
 output when ``--compact-output``/``-c`` is passed::
@@ -51,6 +62,42 @@ To pass the original file path of JSON files to ``dictsdiff``, use
   jq --compact-output '.path = input_filename' **/*.json \
     | dictsdiff --info-key=path
 
+To check only which keys are different (e.g., in CI), use
+``--keys-only``.  It prints one key per line and is faster since no
+table is constructed::
+
+  $ dictsdiff --keys-only *.json
+  a
+  b.d
+  b.e
+
+To pass the diff to other programs, use ``--output-format`` (``csv``,
+``tsv``, ``ndjson``, ``parquet`` or ``arrow``) and ``--output=FILE``::
+
+  dictsdiff --output-format=ndjson *.json | jq .
+
+When there are too many records to read the diff, ``--summary`` shows
+the number of distinct values and the most frequent value of each key,
+ranked by the number of the records differing from it (``--top=N``
+shows only the first ``N`` keys)::
+
+  $ dictsdiff --summary *.json
+       count  missing  distinct  mode  mode_count  differ  min  max
+  key
+  a        3        0         2     2           2       1    1    2
+  b.d      3        0         2     1           2       1    0    1
+  b.e      2        1         1     0           2       1    0    0
+
+Records often fall into a few distinct configurations.  ``--group``
+shows each distinct combination of the values once with the number of
+the records and some of their paths (``--samples=N`` of them)::
+
+  $ dictsdiff --group *.json
+     count     samples  a  b.d   b.e
+  0      1  ['0.json']  1    0     0
+  1      1  ['1.json']  2    1     0
+  2      1  ['2.json']  2    1  <NA>
+
 .. _jq: https://stedolan.github.io/jq/
 """
 
@@ -124,41 +171,113 @@ def process_info_key(info_key):
     return jspath_to_tuple(parse(info_key))
 
 
-def dictsdiff_cli(files, ndjson, transpose, transform, transform_to, info_keys,
-                  **kwds):
-    import pandas
-    from .core import DictsDiff
-    from .loader import diff_files, diff_ndjson, to_info_dict, \
-        transforming_loader
+def process_key_tolerances(default, key_tols):
+    """
+    Merge per-key tolerances ``KEY=VALUE`` into a dict for `key_tolerances`.
+
+    >>> process_key_tolerances(1e-3, ['a.b=0.1'])
+    {None: 0.001, ('a', 'b'): 0.1}
+    >>> process_key_tolerances(1e-3, [])
+    0.001
+
+    """
+    if not key_tols:
+        return default
+    tols = {None: default}
+    for key_tol in key_tols:
+        (key, sep, tol) = key_tol.rpartition('=')
+        try:
+            tols[process_info_key(key)] = float(tol)
+        except Exception:
+            raise CLIError('Invalid per-key tolerance {!r}.  It must be'
+                           ' in the form KEY=VALUE.'.format(key_tol))
+    return tols
+
+
+def dictsdiff_cli(files, ndjson, transpose, transform, transform_to,
+                  transform_batch_size, info_keys, jobs, streaming, cache,
+                  cache_dir, json_backend, keys_only, prune, expand,
+                  key_rtols, key_atols, output_format, output, table,
+                  columns, summary, top, group, samples, **kwds):
+    from .core import DictsDiff, pretty_column_keys
+    from .loader import diff_files, diff_ndjson, diff_ndjson_file, \
+        diff_table_file, scan_ndjson_file_keys, scan_ndjson_keys, \
+        to_info_dict, transforming_loader
+    from .output import BINARY_FORMATS, write_diff
+
+    if transpose and output_format != 'table':
+        raise CLIError('--transpose is supported only by the table format.')
+    summary = summary or top is not None
+    if group and summary:
+        raise CLIError('--group cannot be used with --summary or --top.')
+    if keys_only and (output or output_format != 'table' or summary or
+                      group):
+        raise CLIError('--keys-only cannot be used with --output,'
+                       ' --output-format, --summary, --top or --group.')
 
     kwds['info_keys'] = list(map(process_info_key, info_keys))
-    if files:
+    kwds['rtol'] = process_key_tolerances(kwds['rtol'], key_rtols)
+    kwds['atol'] = process_key_tolerances(kwds['atol'], key_atols)
+    if table:
+        if files or ndjson:
+            raise CLIError('--table cannot be used with FILES or --ndjson.')
+        dd = diff_table_file(
+            table, columns=list(map(process_info_key, columns)) or None,
+            **kwds)
+    elif files:
         if ndjson:
             raise CLIError('FILES and --ndjson are mutually exclusive.')
         if transform:
-            value_dicts = transforming_loader(files, transform, transform_to)
+            value_dicts = transforming_loader(
+                files, transform, transform_to, json_backend=json_backend,
+                jobs=jobs, batch_size=transform_batch_size)
             info_dicts = list(map(to_info_dict, files))
-            dd = DictsDiff(value_dicts, info_dicts, **kwds)
+            dd = DictsDiff(value_dicts, info_dicts, prune=prune, **kwds)
         else:
-            dd = diff_files(parse_file_paths(files), **kwds)
+            if cache is not False and (cache or cache_dir):
+                cache = cache_dir or True
+            else:
+                cache = None
+            dd = diff_files(parse_file_paths(files), jobs=jobs, cache=cache,
+                            json_backend=json_backend, prune=prune,
+                            expand=expand, **kwds)
+    elif keys_only:
+        # Nothing but the first dictionary has to be kept:
+        if ndjson and ndjson != '-':
+            dd = scan_ndjson_file_keys(ndjson, jobs=jobs,
+                                       json_backend=json_backend, **kwds)
+        else:
+            dd = scan_ndjson_keys(getattr(sys.stdin, 'buffer', sys.stdin),
+                                  json_backend=json_backend, **kwds)
     elif ndjson and ndjson != '-':
-        with open(ndjson) as file:
-            dd = diff_ndjson(file, **kwds)
+        dd = diff_ndjson_file(ndjson, jobs=jobs, streaming=streaming,
+                              json_backend=json_backend, prune=prune, **kwds)
     else:
-        dd = diff_ndjson(sys.stdin, **kwds)
-    pdiff = dd.pretty_diff()
-    if transpose:
-        pdiff = pdiff.T
-
-    # Manually detect terminal size, since passing "'display.width',
-    # None" does not detect terminal size (as advertised in
-    # https://pandas.pydata.org/pandas-docs/stable/options.html):
-    width, _ = get_terminal_size()
+        dd = diff_ndjson(getattr(sys.stdin, 'buffer', sys.stdin),
+                         streaming=streaming, json_backend=json_backend,
+                         prune=prune, **kwds)
+
+    if keys_only:
+        # `dd.keys` is computed without pandas.
+        for key in pretty_column_keys(sorted(dd.keys)):
+            print(key)
+        return
 
-    with pandas.option_context('display.max_rows', None,
-                               'display.max_columns', None,
-                               'display.width', width):
-        print(pdiff)
+    options = dict(transpose=transpose, summary=summary, top=top,
+                   group=group, samples=samples)
+    if output and output != '-':
+        if output_format in BINARY_FORMATS:
+            write_diff(dd, output, output_format, **options)
+        else:
+            with open(output, 'w', newline='') as file:
+                write_diff(dd, file, output_format, **options)
+    elif output_format in BINARY_FORMATS:
+        write_diff(dd, sys.stdout.buffer, output_format, **options)
+    else:
+        # The table is written chunk by chunk, rather than
+        # `print(pdiff)` which formats the whole table in memory first:
+        width, _ = get_terminal_size()
+        write_diff(dd, sys.stdout, output_format, width=width, **options)
 
 
 def parse_file_paths(files):
@@ -210,8 +329,56 @@ if sys.version_info[0] == 2:
         'dictsdiff.cli.CLIError', 'CLIError')
 
 
+def non_negative_int(value):
+    """
+    Parse `value` as an integer which is not negative (for argparse).
+
+    >>> non_negative_int('0')
+    0
+    >>> non_negative_int('-1')
+    Traceback (most recent call last):
+      ...
+    argparse.ArgumentTypeError: must be a non-negative integer: '-1'
+
+    """
+    import argparse
+    try:
+        number = int(value)
+    except ValueError:
+        number = -1
+    if number < 0:
+        raise argparse.ArgumentTypeError(
+            'must be a non-negative integer: {!r}'.format(value))
+    return number
+
+
+def positive_int(value):
+    """
+    Parse `value` as a positive integer (for argparse).
+
+    >>> positive_int('1')
+    1
+    >>> positive_int('0')
+    Traceback (most recent call last):
+      ...
+    argparse.ArgumentTypeError: must be a positive integer: '0'
+
+    """
+    import argparse
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+    if number < 1:
+        raise argparse.ArgumentTypeError(
+            'must be a positive integer: {!r}'.format(value))
+    return number
+
+
 def make_parser(doc=__doc__):
     from . import __version__
+    from .loader import JSON_BACKENDS
+    from .output import FORMATS
     import argparse
     parser = argparse.ArgumentParser(
         formatter_class=type('FormatterClass',
@@ -220,6 +387,20 @@ def make_parser(doc=__doc__):
                              {}),
         description=doc)
     parser.add_argument('--version', action='version', version=__version__)
+
+    class BackendsAction(argparse.Action):
+        def __call__(self, parser, namespace, values, option_string=None):
+            from .loader import describe_backends
+            print(describe_backends())
+            parser.exit()
+
+    parser.add_argument(
+        '--backends', action=BackendsAction, nargs=0,
+        default=argparse.SUPPRESS,
+        help="""
+        Show the libraries used for loading JSON and YAML (e.g.,
+        whether libyaml-based CSafeLoader is available) and exit.
+        """)
     parser.add_argument(
         'files', metavar='FILE', nargs='*',
     )
@@ -232,6 +413,122 @@ def make_parser(doc=__doc__):
         specified.
         """,
     )
+    parser.add_argument(
+        '--table', metavar='FILE',
+        help="""
+        Path to a table of records in CSV, TSV, Parquet or Arrow IPC
+        (Feather) format, determined by the extension.  Each row is a
+        record.  Dotted column names (e.g., "a.b") and the fields of
+        struct columns are compared as nested keys and an empty cell
+        (null) as a missing key.  Parquet and Arrow require pyarrow.
+        """)
+    parser.add_argument(
+        '--column', dest='columns', default=[], action='append',
+        metavar='KEY',
+        help="""
+        Read only the column of KEY, and the columns below it, from the
+        --table file.  It can be specified multiple times.  KEY is a
+        JSONPath as in --info-key.
+        """)
+    parser.add_argument(
+        '--streaming', action='store_true',
+        help="""
+        Load ndjson in two passes so that only the values of the
+        different keys are kept in memory.  The input from a pipe is
+        spilled to a temporary file.  It has no effect on FILEs.
+        """)
+    parser.add_argument(
+        '--jobs', '-j', default=1, type=non_negative_int,
+        help="""
+        Number of workers used for loading FILEs or the --ndjson file.
+        For FILEs, threads are used when all of them are JSON or
+        --transform is given and processes are used otherwise.  The
+        --ndjson file is split into byte ranges loaded by processes
+        (unless --streaming or --prune is given).  0 means the number
+        of CPUs.
+        """)
+    parser.set_defaults(cache=None)
+    parser.add_argument(
+        '--cache', action='store_true', default=argparse.SUPPRESS,
+        help="""
+        Cache the dictionaries loaded from FILEs on disk.  A cached
+        entry is used while the modification time and the size (or
+        the content) of the file are unchanged.
+        """)
+    parser.add_argument(
+        '--no-cache', dest='cache', action='store_false',
+        default=argparse.SUPPRESS,
+        help='Do not use the cache even if --cache-dir is given.')
+    parser.add_argument(
+        '--cache-dir',
+        help="""
+        Directory for the cache.  Passing it implies --cache.  If not
+        given, $XDG_CACHE_HOME/dictsdiff or ~/.cache/dictsdiff is used.
+        """)
+    parser.add_argument(
+        '--json-backend', default='auto',
+        choices=('auto',) + JSON_BACKENDS,
+        help="""
+        Library used for decoding JSON.  "auto" uses the fastest one
+        installed.  Note that orjson reads integers wider than 64 bits
+        as floats.
+        """)
+    parser.add_argument(
+        '--output-format', default='table', choices=FORMATS,
+        help="""
+        Format of the output.  The default "table" is for reading.  The
+        other formats write the info and the value columns of the
+        differing keys for other programs.  In csv and tsv, lists and
+        dicts are encoded in JSON.  In ndjson, the missing values are
+        omitted.  parquet and arrow (Arrow IPC file) require pyarrow.
+        """)
+    parser.add_argument(
+        '--output', '-o', metavar='FILE',
+        help='Write the output to FILE instead of the stdout.')
+    parser.add_argument(
+        '--summary', action='store_true',
+        help="""
+        Instead of the values, show for each different key the number
+        of the records with and without it, the number of distinct
+        values, the most frequent value (mode), the number of the
+        records whose value differs from the mode, and the range of the
+        numbers.  The keys are ranked by the last number.
+        """)
+    parser.add_argument(
+        '--top', type=non_negative_int, metavar='N',
+        help='Show --summary only for the first N keys.  Implies --summary.')
+    parser.add_argument(
+        '--group', action='store_true',
+        help="""
+        Show each distinct combination of the values only once, with
+        the number of the records having it and some of their paths
+        (or the values of --info-key).
+        """)
+    parser.add_argument(
+        '--samples', type=non_negative_int, default=3, metavar='N',
+        help='Number of the paths shown by --group (default: 3).')
+    parser.add_argument(
+        '--keys-only', action='store_true',
+        help="""
+        Print only the keys whose values are different or missing, one
+        per line.  It is faster and uses less memory since no table is
+        constructed.
+        """)
+    parser.add_argument(
+        '--expand', action='store_true',
+        help="""
+        Compare each object found by a JSON_PATH as a separate
+        dictionary.  For example, "dictsdiff --expand FILE '$.runs[*]'"
+        compares all the elements of the list "runs".  Without this
+        option, it is an error if a JSON_PATH finds multiple objects.
+        """)
+    parser.add_argument(
+        '--prune', action='store_true',
+        help="""
+        Skip the subtrees that are equal in all dictionaries without
+        flattening them.  It is faster for large, mostly identical
+        documents.  The cache (--cache) is not used with this option.
+        """)
     parser.add_argument(
         '--atol', default=0, type=float,
         help='''
@@ -244,6 +541,18 @@ def make_parser(doc=__doc__):
     parser.add_argument(
         '--rtol', default=0, type=float,
         help='See --atol.')
+    parser.add_argument(
+        '--key-atol', dest='key_atols', default=[], action='append',
+        metavar='KEY=ATOL',
+        help="""
+        Tolerance --atol for a specific key, e.g., "b.e=0.01".  KEY is
+        a JSONPath as in --info-key.  It can be specified multiple
+        times and --atol is used for the other keys.
+        """)
+    parser.add_argument(
+        '--key-rtol', dest='key_rtols', default=[], action='append',
+        metavar='KEY=RTOL',
+        help='Tolerance --rtol for a specific key.  See --key-atol.')
     parser.add_argument(
         '--transpose', '-T', action='store_true',
         help='Transpose table.')
@@ -252,10 +561,16 @@ def make_parser(doc=__doc__):
         help='''Command to transform each file.  It is a Python format
         string that takes FILE path as the first argument.  For
         example, use "jq '.SOME.KEY' {}" to load only a subset of
-        JSON.''')
+        JSON.  If it has the placeholder {files}, it is run for many
+        FILEs at once and must print one line of JSON for each FILE
+        in the same order, e.g., "jq -c '.SOME.KEY' {files}".''')
     parser.add_argument(
         '--transform-to', default='json',
-        help='Output type of <transform> command.')
+        help='''Output type of <transform> command.  It must be json
+        (treated as ndjson) if <transform> has {files}.''')
+    parser.add_argument(
+        '--transform-batch-size', default=256, type=positive_int,
+        help='Maximum number of FILEs passed to a {files} command.')
     parser.add_argument(
         '--info-key', dest='info_keys', default=[], action='append',
         help="""
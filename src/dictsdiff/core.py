@@ -1,5 +1,15 @@
-import numpy
-import pandas
+"""
+Core of dictsdiff.
+
+NumPy and pandas are imported only when they are needed so that the
+CLI can start quickly (e.g., ``dictsdiff --version``).
+"""
+
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from operator import itemgetter
+import numbers
 
 
 class DictsDiffError(Exception):
@@ -23,13 +33,415 @@ def iteritemsdeep(dct):
             yield ((key,), val)
 
 
-def dicts_to_dataframe(dicts):
-    df = pandas.DataFrame.from_dict([dict(iteritemsdeep(d)) for d in dicts])
-    force_tuple_columns(df)
-    return df
+def flatten_dict(dct):
+    """
+    Flatten nested `dct` into a dict whose keys are tuples.
+
+    >>> flatten_dict(dict(a=1, c=dict(d=3)))
+    {('a',): 1, ('c', 'd'): 3}
+
+    """
+    return dict(iteritemsdeep(dct))
+
+
+def _has_nan(value):
+    if isinstance(value, float):
+        return value != value
+    if isinstance(value, dict):
+        return any(map(_has_nan, value.values()))
+    if isinstance(value, (list, tuple)):
+        return any(map(_has_nan, value))
+    return False
+
+
+def _equal_to_first(values):
+    first = values[0]
+    try:
+        equal = all(v is first or v == first for v in values)
+    except (TypeError, ValueError):
+        return False
+    # ``==`` regards the same NaN object (e.g., shared by the JSON
+    # decoder) as equal to itself in containers, unlike the others:
+    return equal and not _has_nan(first)
+
+
+def flatten_differing(dicts, keep=()):
+    """
+    Flatten `dicts` except the subtrees equal in all of them.
+
+    A subtree is skipped without being flattened if every dictionary
+    has it at the same path and it is equal to the one in the first
+    dictionary.  Since subtrees are compared by ``==`` implemented in
+    C, this is much faster than flattening all of them when most of
+    `dicts` are identical.  Subtrees containing the keys in `keep`
+    are not skipped.
+
+    >>> dicts = [{'a': {'b': 1, 'c': 2}, 'd': {'e': 0}},
+    ...          {'a': {'b': 1, 'c': 3}, 'd': {'e': 0}}]
+    >>> flatten_differing(dicts)
+    [{('a', 'c'): 2}, {('a', 'c'): 3}]
+    >>> flatten_differing(dicts, keep=[('d', 'e')])
+    [{('a', 'c'): 2, ('d', 'e'): 0}, {('a', 'c'): 3, ('d', 'e'): 0}]
+
+    Subtrees missing in some dictionaries are flattened:
+
+    >>> flatten_differing([{'a': {'b': 1}}, {}])
+    [{('a', 'b'): 1}, {}]
+
+    Subtrees with a NaN are flattened as well since it is not equal to
+    itself:
+
+    >>> nan = float('nan')
+    >>> flatten_differing([{'a': {'b': nan}}, {'a': {'b': nan}}])
+    [{('a', 'b'): nan}, {('a', 'b'): nan}]
+
+    """
+    flats = [{} for _ in dicts]
+    _flatten_differing(list(enumerate(dicts)), (), len(flats), flats,
+                       [tuple(k) for k in keep])
+    return flats
+
+
+def _flatten_differing(pairs, prefix, nall, flats, keep):
+    keys = {}
+    for (_, dct) in pairs:
+        keys.update(dict.fromkeys(dct))
+    for key in keys:
+        path = prefix + (key,)
+        sub = [(i, dct[key]) for (i, dct) in pairs if key in dct]
+        if len(sub) == nall and \
+                _equal_to_first([v for (_, v) in sub]) and \
+                not any(k[:len(path)] == path for k in keep):
+            continue
+        subdicts = []
+        for (i, value) in sub:
+            if isinstance(value, dict):
+                subdicts.append((i, value))
+            else:
+                flats[i][path] = value
+        if subdicts:
+            _flatten_differing(subdicts, path, nall, flats, keep)
+
+
+class ColumnBuilder(object):
+    """
+    Accumulate flattened dictionaries into per-key column buffers.
+
+    Each key is mapped to a column number by `index`.  For each column,
+    the values and the numbers of the rows having them are appended to
+    `values` and `rows`, respectively.  Missing values are filled only
+    when the columns are materialized.
+
+    >>> builder = ColumnBuilder()
+    >>> builder.append([(('a',), 1), (('b', 'c'), 2)])
+    >>> builder.append([(('a',), 3)])
+    >>> builder.keys
+    [('a',), ('b', 'c')]
+    >>> builder.column(0)
+    [1, 3]
+    >>> builder.column(1)
+    [2, nan]
+    >>> builder.to_dataframe()
+       (a,)  (b, c)
+    0     1       2
+    1     3    <NA>
+
+    """
+
+    def __init__(self, nrows=0):
+        self.nrows = nrows
+        self.index = {}
+        self.keys = []
+        self.rows = []
+        self.values = []
+
+    def append(self, items):
+        """
+        Add a row given as an iterable of ``(key, value)`` pairs.
+        """
+        row = self.nrows
+        index = self.index
+        for key, value in items:
+            j = index.get(key)
+            if j is None:
+                j = index[key] = len(self.keys)
+                self.keys.append(key)
+                self.rows.append(array('l'))
+                self.values.append([])
+            self.rows[j].append(row)
+            self.values[j].append(value)
+        self.nrows = row + 1
+
+    def extend(self, other):
+        """
+        Append the rows of another builder `other`.
+
+        >>> builder = ColumnBuilder()
+        >>> builder.append([(('a',), 1)])
+        >>> other = ColumnBuilder()
+        >>> other.append([(('b',), 2)])
+        >>> builder.extend(other)
+        >>> builder.to_dataframe()
+           (a,)  (b,)
+        0     1  <NA>
+        1  <NA>     2
+
+        """
+        offset = self.nrows
+        for (key, rows, values) in zip(other.keys, other.rows, other.values):
+            j = self.index.get(key)
+            if j is None:
+                j = self.index[key] = len(self.keys)
+                self.keys.append(key)
+                self.rows.append(array('l'))
+                self.values.append([])
+            self.rows[j].extend(map(offset.__add__, rows))
+            self.values[j].extend(values)
+        self.nrows += other.nrows
+
+    def add_column(self, key, rows, values):
+        """
+        Add a column of a new `key` having `values` at `rows`.
+
+        >>> builder = ColumnBuilder(3)
+        >>> builder.add_column(('a',), [0, 2], [1, 2])
+        >>> builder.row(2)
+        {('a',): 2}
+
+        """
+        if key in self.index:
+            raise ValueError('Duplicate key: {!r}'.format(key))
+        self.index[key] = len(self.keys)
+        self.keys.append(key)
+        self.rows.append(array('l', rows))
+        self.values.append(list(values))
+
+    def move(self, key, other):
+        """
+        Move the column of `key` to `other` having the same number of rows.
+
+        The column of `key` in `other`, if any, is replaced.  Nothing
+        is done if there is no `key` in this builder.
+        """
+        j = self.index.get(key)
+        if j is None:
+            return
+        rows = self.rows.pop(j)
+        values = self.values.pop(j)
+        del self.keys[j]
+        self.index = {k: i for (i, k) in enumerate(self.keys)}
+        i = other.index.get(key)
+        if i is None:
+            other.index[key] = len(other.keys)
+            other.keys.append(key)
+            other.rows.append(rows)
+            other.values.append(values)
+        else:
+            other.rows[i] = rows
+            other.values[i] = values
+
+    def column(self, j, missing=float('nan')):
+        """
+        Return `j`-th column as a list with `missing` filled in.
+        """
+        values = self.values[j]
+        if len(values) == self.nrows:
+            return values
+        dense = [missing] * self.nrows
+        for (row, value) in zip(self.rows[j], values):
+            dense[row] = value
+        return dense
+
+    def row(self, i):
+        """
+        Return `i`-th row as a dict without the missing values.
+
+        >>> builder = ColumnBuilder()
+        >>> builder.append([(('a',), 1), (('b',), 2)])
+        >>> builder.append([(('b',), 3)])
+        >>> builder.row(1)
+        {('b',): 3}
+
+        """
+        row = {}
+        for (key, rows, values) in zip(self.keys, self.rows, self.values):
+            k = bisect_left(rows, i)
+            if k < len(rows) and rows[k] == i:
+                row[key] = values[k]
+        return row
+
+    def different_keys(self, rtol=0, atol=0):
+        """
+        Find keys whose values are different or missing.
+
+        It is equivalent to `different_keys` of `to_dataframe` but
+        pandas is not used.  NumPy is used only for comparing the float
+        columns with tolerance, which is done at once for all of them
+        by `float_columns_differ`.  See `key_tolerances` for `rtol` and
+        `atol`.
+
+        >>> builder = ColumnBuilder()
+        >>> builder.append([(('a',), 1), (('b',), 1.0), (('c',), 'x')])
+        >>> builder.append([(('a',), 1), (('b',), 1.001), (('c',), 'x')])
+        >>> builder.append([(('a',), 1), (('b',), 1.0)])
+        >>> builder.different_keys()
+        [('b',), ('c',)]
+        >>> builder.different_keys(atol=1e-2)
+        [('c',)]
+
+        """
+        nrows = self.nrows
+        if nrows <= 1:
+            return []
+        differs = [True] * len(self.keys)
+        floats = []
+        for (j, (key, values)) in enumerate(zip(self.keys, self.values)):
+            if len(values) < nrows:
+                continue
+            tols = key_tolerances(key, rtol, atol)
+            if any(tols) and set(map(type, values)) == {float}:
+                floats.append((j, tols))
+            else:
+                differs[j] = list_differs(values, *tols)
+        if floats:
+            found = float_columns_differ(
+                [self.values[j] for (j, _) in floats],
+                [r for (_, (r, _)) in floats],
+                [a for (_, (_, a)) in floats])
+            for ((j, _), d) in zip(floats, found.tolist()):
+                differs[j] = d
+        return [key for (key, d) in zip(self.keys, differs) if d]
+
+    def sparse_column(self, j):
+        """
+        Return `j`-th column as a `pandas.arrays.SparseArray`.
+
+        Only the present values and their row numbers are stored; the
+        missing values are NaN as the `fill_value` of the array.
+
+        >>> builder = ColumnBuilder()
+        >>> builder.append([(('a',), 1)])
+        >>> builder.append([])
+        >>> builder.sparse_column(0)
+        [1, nan]
+        Fill: nan
+        IntIndex
+        Indices: array([0], dtype=int32)
+        <BLANKLINE>
+
+        """
+        import numpy
+        import pandas
+        # `IntIndex` is not exported by pandas but it is needed to
+        # construct a `SparseArray` without making a dense array.
+        from pandas._libs.sparse import IntIndex
+        # Infer the dtype the same way as the dense columns:
+        values = pandas.Series(_keep_none(self.values[j])).to_numpy()
+        index = IntIndex(self.nrows,
+                         numpy.asarray(self.rows[j], dtype=numpy.int32))
+        if None in self.values[j]:
+            # The constructor would replace `None` by the fill value.
+            return pandas.arrays.SparseArray._simple_new(
+                values, index, pandas.SparseDtype(object, numpy.nan))
+        return pandas.arrays.SparseArray(
+            values, sparse_index=index, fill_value=numpy.nan)
+
+    def nullable_column(self, j):
+        """
+        Return `j`-th column as a nullable integer or boolean array.
+
+        The missing values are recorded in the mask of the array so
+        that the integers are not upcast to float.  `None` is returned
+        if the values are not all `int` or all `bool`.
+
+        >>> builder = ColumnBuilder()
+        >>> builder.append([(('a',), 1)])
+        >>> builder.append([])
+        >>> builder.nullable_column(0)
+        <IntegerArray>
+        [1, <NA>]
+        Length: 2, dtype: Int64
+
+        """
+        values = self.values[j]
+        types = set(map(type, values))
+        if types == {int}:
+            dtype = 'int64'
+        elif types == {bool}:
+            dtype = 'bool'
+        else:
+            return None
+        import numpy
+        import pandas
+        try:
+            present = numpy.array(values, dtype=dtype)
+        except OverflowError:
+            return None
+        rows = numpy.asarray(self.rows[j], dtype=numpy.intp)
+        data = numpy.zeros(self.nrows, dtype=dtype)
+        data[rows] = present
+        mask = numpy.ones(self.nrows, dtype=bool)
+        mask[rows] = False
+        if dtype == 'bool':
+            return pandas.arrays.BooleanArray(data, mask)
+        return pandas.arrays.IntegerArray(data, mask)
+
+    def to_dataframe(self, index=None, keys=None, sparse=False):
+        """
+        Construct a `pandas.DataFrame` whose columns are tuple keys.
+
+        Only the columns for `keys` are constructed if given.  The
+        integer and boolean columns with missing values are nullable
+        arrays (see `nullable_column`).  If `sparse` is true, the
+        columns with missing values are stored as sparse arrays
+        instead (see `sparse_column`).
+        """
+        import pandas
+        if index is None:
+            index = pandas.RangeIndex(self.nrows)
+        if keys is None:
+            columns = range(len(self.keys))
+        else:
+            columns = [self.index[key] for key in keys]
+        data = {}
+        for j in columns:
+            if len(self.values[j]) == self.nrows:
+                data[j] = _keep_none(self.values[j], index)
+            elif sparse:
+                data[j] = self.sparse_column(j)
+            else:
+                data[j] = self.nullable_column(j)
+                if data[j] is None:
+                    data[j] = _keep_none(self.column(j), index)
+        df = pandas.DataFrame(data, index=index)
+        df.columns = pandas.Index([self.keys[j] for j in columns],
+                                  dtype=object, tupleize_cols=False)
+        return df
+
+
+def _keep_none(values, index=None):
+    """
+    Make a list `values` an object `pandas.Series` if it has `None`.
+
+    Otherwise pandas may infer a string dtype in which `None` (JSON
+    null) becomes NaN, i.e., a missing value.  Note that this happens
+    even for object arrays; only a `pandas.Series` keeps its dtype.
+    """
+    if None not in values:
+        return values
+    import pandas
+    return pandas.Series(values, index=index, dtype=object)
+
+
+def dicts_to_dataframe(dicts, flat=False):
+    builder = ColumnBuilder()
+    for d in dicts:
+        builder.append(d.items() if flat else iteritemsdeep(d))
+    return builder.to_dataframe()
 
 
 def force_tuple_columns(df):
+    import pandas
     if len(df.columns) > 0 and not isinstance(df.columns[0], tuple):
         # Workaround for the bug in pandas:
         # https://github.com/pandas-dev/pandas/issues/16769
@@ -40,51 +452,977 @@ def force_tuple_columns(df):
         del df[dummy]
 
 
-def different_keys(df, rtol=0, atol=0):
+def _is_nullable(column):
+    """
+    Check if `column` is an array with missing values as `pandas.NA`.
+    """
+    import pandas
+    return (isinstance(column, pandas.api.extensions.ExtensionArray) and
+            column.dtype.na_value is pandas.NA)
+
+
+def different_keys(df, rtol=0, atol=0, blocksize=2 ** 22):
+    """
+    Find columns of `df` whose values are different or missing.
+
+    The float columns are compared in blocks of about `blocksize`
+    elements by `float_columns_differ` and the other columns one by
+    one.  See `key_tolerances` for `rtol` and `atol`.
+
+    >>> df = dicts_to_dataframe([{'a': 1.0, 'b': 1.0, 'c': 'x'},
+    ...                          {'a': 1.1, 'b': 1.01, 'c': 'x'}])
+    >>> list(different_keys(df, atol={('b',): 0.1}))
+    [('a',)]
+
+    """
+    import numpy
     if len(df) <= 1:
         return
-    for key, dtype in zip(df.columns, df.dtypes):
+    floats = [key for (key, dtype) in df.dtypes.items()
+              if isinstance(dtype, numpy.dtype) and dtype.kind == 'f']
+    if floats:
+        tols = [key_tolerances(key, rtol, atol) for key in floats]
+        found = []
+        # Only a block of the float columns is copied into an array at
+        # a time:
+        step = max(1, blocksize // len(df))
+        for start in range(0, len(floats), step):
+            stop = start + step
+            found.extend(float_columns_differ(
+                df[floats[start:stop]].to_numpy(dtype=float).T,
+                [r for (r, _) in tols[start:stop]],
+                [a for (_, a) in tols[start:stop]],
+                blocksize=blocksize).tolist())
+        floats = dict(zip(floats, found))
+    for key in df.columns:
+        if key in floats:
+            if floats[key]:
+                yield key
+            continue
         column = df[key].values  # to 1D numpy array
-        if (rtol or atol) and numpy.issubdtype(dtype, numpy.floating):
-            if not numpy.allclose(column[0], column[1:], rtol=rtol, atol=atol):
+        if _is_nullable(column):
+            # A missing value means the key differs and the rest are
+            # compared exactly without upcasting to float.
+            if column.isna().any():
                 yield key
-        elif dtype == object:
-            # Since "column[0] == column[1:]" does not work for object
-            # array, it is handled explicitly here.
-            first = column[0]
-            if not all(first == c for c in column[1:]):
+                continue
+            column = column.to_numpy()
+        if not isinstance(column, numpy.ndarray):
+            # Extension arrays such as pandas' string array are
+            # compared much faster as plain object arrays.
+            column = numpy.asarray(column, dtype=object)
+        dtype = column.dtype
+        if dtype == object:
+            if object_column_differs(column):
                 yield key
-        elif not (column[0] == column[1:]).all():
+        elif not all_equal_to_first(column):
             yield key
 
 
+def key_tolerances(key, rtol=0, atol=0):
+    """
+    Return the tolerances ``(rtol, atol)`` for comparing `key`.
+
+    `rtol` and `atol` are numbers or dicts mapping flattened keys to
+    numbers.  The value for `None` in a dict (0 if absent) is used for
+    the keys not in it.
+
+    >>> key_tolerances(('a',), rtol=1e-3, atol={('a',): 0.1})
+    (0.001, 0.1)
+    >>> key_tolerances(('b',), rtol=1e-3, atol={('a',): 0.1, None: 0.01})
+    (0.001, 0.01)
+
+    """
+    if isinstance(rtol, dict):
+        rtol = rtol.get(key, rtol.get(None, 0))
+    if isinstance(atol, dict):
+        atol = atol.get(key, atol.get(None, 0))
+    return (rtol, atol)
+
+
+def float_columns_differ(columns, rtol=0, atol=0, blocksize=2 ** 22):
+    """
+    Check if each of the float `columns` has a value not close to its first.
+
+    `columns` is a sequence of equal-length lists or 1-D arrays.  They
+    are stacked into 2-D blocks of about `blocksize` elements which are
+    compared by `numpy.isclose` so that the number of Python-level
+    iterations does not grow with the number of columns.  `rtol` and
+    `atol` are numbers or sequences of the tolerances for each column.
+    It returns a boolean array.
+
+    >>> float_columns_differ([[1.0, 1.0], [1.0, 1.001], [1.0, 1.1]],
+    ...                      atol=[0, 1e-2, 1e-2]).tolist()
+    [False, False, True]
+
+    """
+    import numpy
+    ncols = len(columns)
+    rtol = numpy.broadcast_to(numpy.asarray(rtol, dtype=float), (ncols,))
+    atol = numpy.broadcast_to(numpy.asarray(atol, dtype=float), (ncols,))
+    differs = numpy.zeros(ncols, dtype=bool)
+    if not ncols:
+        return differs
+    step = max(1, blocksize // max(1, len(columns[0])))
+    for start in range(0, ncols, step):
+        stop = start + step
+        block = numpy.array(columns[start:stop], dtype=float)
+        # Same as `values_equal(first, value, rtol, atol)`:
+        close = numpy.isclose(block[:, :1], block,
+                              rtol=rtol[start:stop, None],
+                              atol=atol[start:stop, None])
+        differs[start:stop] = ~close.all(axis=1)
+    return differs
+
+
+def all_equal_to_first(column, chunksize=2 ** 16):
+    """
+    Check if all elements of `column` are equal to the first one.
+
+    The comparison is vectorized within each chunk of `chunksize`
+    elements and stops at the first chunk with a mismatch.
+    """
+    first = column[0]
+    for start in range(1, len(column), chunksize):
+        if not (column[start:start + chunksize] == first).all():
+            return False
+    return True
+
+
+def object_column_differs(column):
+    """
+    Check if an object array `column` has different or missing values.
+
+    Scalar values are compared by NumPy's element-wise comparison of
+    the objects without a Python-level loop, stopping at the first
+    chunk with a mismatch.  Missing keys are represented by NaN which
+    is not equal to anything, while ``None`` (e.g., JSON null) is equal
+    to ``None``.
+
+    >>> import numpy
+    >>> object_column_differs(numpy.array(['a', 'a', 'a'], dtype=object))
+    False
+    >>> object_column_differs(numpy.array(['a', 'b', 'a'], dtype=object))
+    True
+    >>> object_column_differs(numpy.array(['a', numpy.nan], dtype=object))
+    True
+    >>> object_column_differs(numpy.array([None, None], dtype=object))
+    False
+    >>> object_column_differs(numpy.array([None, numpy.nan], dtype=object))
+    True
+
+    Containers are compared one by one in Python since NumPy would
+    broadcast them:
+
+    >>> import pandas
+    >>> object_column_differs(pandas.Series([[1], [1], [2]]).values)
+    True
+
+    """
+    import numpy
+    first = column[0]
+    if not isinstance(first, (list, tuple, dict, set, numpy.ndarray)):
+        try:
+            return not all_equal_to_first(column)
+        except (TypeError, ValueError):
+            # Some elements do not support element-wise comparison
+            # (e.g., they are arrays).
+            pass
+    return not all(first == c for c in column[1:])
+
+
+def list_differs(values, rtol=0, atol=0):
+    """
+    Check if any of `values` is not equal to the first one.
+
+    Values are compared by `values_equal`.
+
+    >>> list_differs([1, 1, 1])
+    False
+    >>> list_differs([1.0, 1.001], atol=1e-2)
+    False
+    >>> list_differs([None, None])
+    False
+    >>> list_differs([float('nan')] * 2)
+    True
+
+    """
+    first = values[0]
+    if (rtol or atol) and _is_number(first):
+        return not all(values_equal(first, v, rtol, atol) for v in values)
+    if isinstance(first, float) and first != first:
+        return len(values) > 1
+    try:
+        # `list.count` compares the values in C:
+        return values.count(first) != len(values)
+    except (TypeError, ValueError):
+        return not all(values_equal(first, v) for v in values)
+
+
+def _is_number(value):
+    # Skip the slow ABC check for the types in JSON:
+    if type(value) in (int, float):
+        return True
+    if type(value) in (str, bool, list, dict) or value is None:
+        return False
+    # Note: NumPy's scalar types are registered as `numbers.Number`
+    # except for `numpy.bool_`.
+    return isinstance(value, numbers.Number) and not isinstance(value, bool)
+
+
+def values_equal(a, b, rtol=0, atol=0):
+    """
+    Compare leaf values `a` and `b` the same way as `different_keys`.
+
+    When `rtol` or `atol` is non-zero and one of the values is a
+    floating point number, they are compared using the tolerances.
+
+    >>> values_equal(1, 1.0)
+    True
+    >>> values_equal(1.0, 0.999)
+    False
+    >>> values_equal(1.0, 0.999, atol=1e-2)
+    True
+    >>> values_equal(float('nan'), float('nan'))
+    False
+
+    """
+    if (rtol or atol) and _is_number(a) and _is_number(b) and \
+            (isinstance(a, float) or isinstance(b, float)):
+        return bool(a == b or abs(a - b) <= atol + rtol * abs(b))
+    try:
+        return bool(a == b)
+    except (TypeError, ValueError):
+        return False
+
+
+class DifferentKeysTracker(object):
+    """
+    Find keys whose values are different or missing, one dict at a time.
+
+    Each flattened dictionary is compared against the first one.  Only
+    the first dictionary and the set of keys found so far are kept so
+    that the memory usage does not grow with the number of
+    dictionaries.
+
+    >>> tracker = DifferentKeysTracker()
+    >>> tracker.add({('a',): 1, ('b',): 2, ('c',): 3})
+    >>> tracker.add({('a',): 1, ('b',): 0})
+    >>> tracker.add({('a',): 1, ('b',): 2, ('d',): 4})
+    >>> sorted(tracker.keys)
+    [('b',), ('c',), ('d',)]
+    >>> tracker.count
+    3
+
+    """
+
+    def __init__(self, rtol=0, atol=0, ignore=()):
+        self.rtol = rtol
+        self.atol = atol
+        self.ignore = set(ignore)
+        self.first = None
+        self.keys = set()
+        self.count = 0
+
+    def add(self, flat):
+        """
+        Compare a flattened dictionary `flat` with the first one.
+        """
+        self.count += 1
+        ignore = self.ignore
+        if self.first is None:
+            self.first = {k: v for k, v in flat.items() if k not in ignore}
+            return
+
+        first = self.first
+        keys = self.keys
+        shared = 0
+        for key, val in flat.items():
+            if key in ignore:
+                continue
+            try:
+                ref = first[key]
+            except KeyError:
+                keys.add(key)
+                continue
+            shared += 1
+            if key not in keys and not values_equal(
+                    ref, val, *key_tolerances(key, self.rtol, self.atol)):
+                keys.add(key)
+        if shared < len(first):
+            keys.update(k for k in first if k not in flat)
+
+    def update(self, other):
+        """
+        Merge `other` tracker which has seen dictionaries added after.
+
+        The first dictionary of `other` is compared with the first one
+        of this tracker.  Hence the result is the same as adding all
+        the dictionaries to this tracker, except that non-zero `rtol`
+        or `atol` may find slightly different keys since the
+        comparison with tolerance is not transitive.
+
+        >>> tracker = DifferentKeysTracker()
+        >>> tracker.add({('a',): 1, ('b',): 2})
+        >>> other = DifferentKeysTracker()
+        >>> other.add({('a',): 1, ('b',): 3})
+        >>> other.add({('a',): 1, ('b',): 3, ('c',): 4})
+        >>> tracker.update(other)
+        >>> sorted(tracker.keys)
+        [('b',), ('c',)]
+        >>> tracker.count
+        3
+
+        """
+        if other.first is None:
+            return
+        count = self.count
+        self.add(other.first)
+        self.keys.update(other.keys)
+        self.count = count + other.count
+
+
+class _NaN(object):
+    def __repr__(self):
+        return 'NaN'
+
+
+_NAN = _NaN()
+
+
+def _freeze(value):
+    """
+    Convert `value` to a hashable object which is equal iff `value` is.
+    """
+    if isinstance(value, float) and value != value:
+        return _NAN
+    if isinstance(value, list):
+        return (list, tuple(map(_freeze, value)))
+    if isinstance(value, dict):
+        return (dict, frozenset((k, _freeze(v)) for (k, v) in value.items()))
+    try:
+        hash(value)
+    except TypeError:
+        return (type(value), repr(value))
+    return value
+
+
+def _count_values(column):
+    """
+    Count non-NaN values in `column` as in `DifferentKeysCounter.values`.
+
+    `column` is a list or an array.  NumPy is used only for the latter.
+    """
+    if not isinstance(column, list):
+        import numpy
+        if isinstance(column, numpy.ndarray) and column.dtype != object:
+            if numpy.issubdtype(column.dtype, numpy.floating):
+                column = column[~numpy.isnan(column)]
+            uniques, counts = numpy.unique(column, return_counts=True)
+            return {u: [int(n), u]
+                    for (u, n) in zip(uniques.tolist(), counts)}
+        column = numpy.asarray(column, dtype=object)
+    counts = {}
+    for value in column:
+        frozen = _freeze(value)
+        if frozen is _NAN:
+            continue
+        try:
+            counts[frozen][0] += 1
+        except KeyError:
+            counts[frozen] = [1, value]
+    return counts
+
+
+class DifferentKeysCounter(object):
+    """
+    Maintain different keys while flattened dictionaries are added and removed.
+
+    For each key, the number of dictionaries having the key and the
+    number of occurrences of each value are kept so that `add` and
+    `remove` take time proportional to the size of the given
+    dictionary rather than the number of dictionaries.  Keys are
+    bucketed by the number of dictionaries having them so that the
+    keys becoming (in)complete by an addition or a removal are found
+    without scanning all keys.
+
+    When `rtol` or `atol` is non-zero, numbers are compared with the
+    value in the `reference` dictionary (see `set_reference`).  The
+    number of the distinct values of each key not close to the
+    reference value is kept as well so that the tolerant comparison
+    does not look at all the values either.  Only `set_reference`
+    takes time proportional to the number of the distinct values.
+
+    >>> counter = DifferentKeysCounter()
+    >>> counter.add({('a',): 1, ('b',): 2})
+    >>> counter.add({('a',): 1, ('b',): 3, ('c',): 4})
+    >>> sorted(counter.keys)
+    [('b',), ('c',)]
+    >>> counter.remove({('a',): 1, ('b',): 2})
+    >>> sorted(counter.keys)
+    []
+
+    """
+
+    def __init__(self, rtol=0, atol=0):
+        self.rtol = rtol
+        self.atol = atol
+        self.count = 0
+        self.present = {}     # key -> number of dicts having it
+        self.by_present = {}  # number of dicts -> keys
+        self.values = {}      # key -> {frozen value: [count, value]}
+        self.far = {}         # key -> number of values not close to reference
+        self.reference = {}
+        self.keys = set()
+
+    def _move(self, key, old, new):
+        if old:
+            bucket = self.by_present[old]
+            bucket.discard(key)
+            if not bucket:
+                del self.by_present[old]
+        if new:
+            self.by_present.setdefault(new, set()).add(key)
+            self.present[key] = new
+        else:
+            del self.present[key]
+
+    def _is_far(self, key, value):
+        try:
+            ref = self.reference[key]
+        except KeyError:
+            return True
+        (rtol, atol) = key_tolerances(key, self.rtol, self.atol)
+        return not values_equal(ref, value, rtol, atol)
+
+    def _count_far(self, key):
+        self.far[key] = sum(self._is_far(key, value)
+                            for (_, value) in self.values[key].values())
+
+    def _all_equal(self, key):
+        counts = self.values[key]
+        if _NAN in counts:
+            return False
+        if len(counts) == 1:
+            return True
+        if not (self.rtol or self.atol):
+            return False
+        return not self.far[key]
+
+    def _update(self, key):
+        if self.present.get(key) == self.count and self._all_equal(key):
+            self.keys.discard(key)
+        else:
+            self.keys.add(key)
+
+    def add(self, flat):
+        """
+        Add a flattened dictionary.
+        """
+        tolerant = self.rtol or self.atol
+        before = self.count
+        self.count += 1
+        for (key, value) in flat.items():
+            old = self.present.get(key, 0)
+            self._move(key, old, old + 1)
+            counts = self.values.setdefault(key, {})
+            frozen = _freeze(value)
+            try:
+                counts[frozen][0] += 1
+            except KeyError:
+                counts[frozen] = [1, value]
+                if tolerant:
+                    self.far[key] = (self.far.get(key, 0) +
+                                     self._is_far(key, value))
+            self._update(key)
+        # Keys that all the previous dicts have but `flat` lacks:
+        self.keys.update(self.by_present.get(before, ()))
+
+    def remove(self, flat):
+        """
+        Remove a flattened dictionary previously passed to `add`.
+        """
+        tolerant = self.rtol or self.atol
+        self.count -= 1
+        # Keys that all the remaining dicts but not `flat` have:
+        complete = list(self.by_present.get(self.count, ()))
+        for (key, value) in flat.items():
+            old = self.present[key]
+            self._move(key, old, old - 1)
+            counts = self.values[key]
+            frozen = _freeze(value)
+            counts[frozen][0] -= 1
+            if not counts[frozen][0]:
+                if tolerant:
+                    self.far[key] -= self._is_far(key, counts[frozen][1])
+                del counts[frozen]
+            if not counts:
+                del self.values[key]
+                self.far.pop(key, None)
+                self.keys.discard(key)
+            else:
+                self._update(key)
+        for key in complete:
+            if key not in flat:
+                self._update(key)
+
+    @classmethod
+    def from_dataframe(cls, df, **kwds):
+        """
+        Create a counter as if each row of `df` is added (NaN as missing).
+
+        It is done column by column and numeric columns are counted by
+        NumPy.
+
+        >>> df = dicts_to_dataframe([{'a': 1, 'b': 'x'}, {'a': 2}])
+        >>> sorted(DifferentKeysCounter.from_dataframe(df).keys)
+        [('a',), ('b',)]
+
+        """
+        def column(key):
+            values = df[key].values
+            if _is_nullable(values):
+                values = values[~values.isna()].to_numpy()
+            return values
+
+        return cls.from_columns(
+            len(df), ((key, column(key)) for key in df.columns), **kwds)
+
+    @classmethod
+    def from_columns(cls, count, columns, **kwds):
+        """
+        Create a counter as if `count` dictionaries are added.
+
+        `columns` is an iterable of ``(key, values)`` pairs where
+        `values` is a list or an array of the values of the key.  NaN
+        and the values not in `values` are treated as missing.
+
+        >>> builder = ColumnBuilder()
+        >>> builder.append([(('a',), 1), (('b',), 'x')])
+        >>> builder.append([(('a',), 1)])
+        >>> counter = DifferentKeysCounter.from_columns(
+        ...     builder.nrows, zip(builder.keys, builder.values))
+        >>> sorted(counter.keys)
+        [('b',)]
+
+        """
+        self = cls(**kwds)
+        self.count = count
+        for (key, column) in columns:
+            counts = _count_values(column)
+            present = sum(n for (n, _) in counts.values())
+            if not present:
+                continue
+            self.values[key] = counts
+            self._move(key, 0, present)
+            if self.rtol or self.atol:
+                self._count_far(key)
+            self._update(key)
+        return self
+
+    def set_reference(self, flat):
+        """
+        Set the dictionary whose values are used for tolerant comparison.
+        """
+        self.reference = flat
+        if self.rtol or self.atol:
+            for key in self.values:
+                self._count_far(key)
+                self._update(key)
+
+
 def pretty_column_keys(columns):
     return list(map('.'.join, columns))
 
 
 class DictsDiff(object):
 
-    def __init__(self, value_dicts, info_dicts, info_keys=[], **kwds):
-        self.value_df = dicts_to_dataframe(value_dicts)
-        self.info_df = dicts_to_dataframe(info_dicts)
-        self._move_info_values(info_keys)
-        force_tuple_columns(self.info_df)
+    """
+    Compare dictionaries and hold their values and meta information.
+
+    The different keys are found without pandas; `value_df`,
+    `info_df`, `diff_df` and `pretty_diff` construct pandas objects
+    when they are accessed for the first time.
+
+    If `prune` is true, the subtrees equal in all `value_dicts` are
+    not flattened (see `flatten_differing`).  The keys in them are not
+    in `value_df` then.  Records cannot be added to such an instance.
+
+    If `sparse` is true, the columns of `value_df` with missing values
+    are sparse arrays storing only the present values and their
+    positions (see `ColumnBuilder.sparse_column`).  It saves memory
+    for wide records each having a small subset of the keys.
+
+    >>> dd = diff_dicts([{'a': 1, 'b': 2}, {'a': 1, 'b': 3}])
+    >>> dd.keys
+    [('b',)]
+    >>> dd._value_df is None
+    True
+    >>> dd.value_df
+       (a,)  (b,)
+    0     1     2
+    1     1     3
+
+    """
+
+    def __init__(self, value_dicts, info_dicts, info_keys=[], flat=False,
+                 prune=False, sparse=False, **kwds):
+        if prune and not flat:
+            value_dicts = flatten_differing(list(value_dicts), keep=info_keys)
+            flat = True
+        values = ColumnBuilder()
+        infos = ColumnBuilder()
+        for (value, info) in zip(value_dicts, info_dicts):
+            values.append(value.items() if flat else iteritemsdeep(value))
+            infos.append(iteritemsdeep(info))
+        self._setup(values, infos, info_keys, prune, sparse, kwds)
+
+    @classmethod
+    def from_builders(cls, values, infos, info_keys=[], sparse=False,
+                      **kwds):
+        """
+        Create an instance from `ColumnBuilder`s of flattened dicts.
+
+        `values` and `infos` must have the same number of rows.  They
+        are owned by the returned instance.
+        """
+        self = cls.__new__(cls)
+        self._setup(values, infos, info_keys, False, sparse, kwds)
+        return self
+
+    def _setup(self, values, infos, info_keys, pruned, sparse, kwds):
+        for key in info_keys:
+            values.move(key, infos)
+        # Values are kept in the builders until a DataFrame is needed:
+        self._values = values
+        self._infos = infos
+        self._value_df = None
+        self._info_df = None
+        self._pruned = pruned
+        self._sparse = sparse
         self.info_keys = info_keys
-        self.keys = sorted(different_keys(self.value_df, **kwds))
-        self.diff_df = pandas.concat(
-            [self.value_df[self.keys], self.info_df],
-            axis=1,
-            keys=['value', 'info'],
-        )
-
-    def _move_info_values(self, info_keys):
+        self._kwds = kwds
+        self._keys = sorted(values.different_keys(**kwds))
+        self._diff_df = None
+        self._counter = None
+        self._reference_index = None
+        self._pending = []     # [(index, flat_value, flat_info)]
+        self._removed = set()  # indices to be dropped from `_value_df`
+        self._next_index = values.nrows
+
+    @staticmethod
+    def _move_info_values(info_keys, flat_value, flat_info):
         for key in info_keys:
             try:
-                self.info_df[key] = self.value_df.pop(key)
+                flat_info[key] = flat_value.pop(key)
             except KeyError:
                 pass
 
+    @property
+    def keys(self):
+        """
+        Sorted list of the keys whose values are different or missing.
+        """
+        if self._keys is None:
+            self._keys = sorted(self._counter.keys)
+        return self._keys
+
+    @property
+    def value_df(self):
+        self._flush()
+        return self._value_df
+
+    @property
+    def info_df(self):
+        self._flush()
+        return self._info_df
+
+    @property
+    def diff_df(self):
+        import pandas
+        if self._diff_df is None:
+            if self._value_df is None:
+                # Do not construct the columns of the other keys:
+                values, infos = self._build_frames(self.keys)
+            else:
+                values = self.value_df[self.keys]
+                infos = self.info_df
+            self._diff_df = pandas.concat(
+                [values, infos],
+                axis=1,
+                keys=['value', 'info'],
+            )
+        return self._diff_df
+
+    def _build_frames(self, keys=None):
+        values = self._values.to_dataframe(keys=keys, sparse=self._sparse)
+        infos = self._infos.to_dataframe()
+        force_tuple_columns(infos)
+        if self._removed:
+            removed = list(self._removed)
+            values = values.drop(index=removed)
+            infos = infos.drop(index=removed)
+        return values, infos
+
+    def _flush(self):
+        import pandas
+        if self._value_df is None:
+            self._value_df, self._info_df = self._build_frames()
+            self._values = self._infos = None
+            self._removed.clear()
+        if self._removed:
+            removed = list(self._removed)
+            self._value_df = self._value_df.drop(index=removed)
+            self._info_df = self._info_df.drop(index=removed)
+            self._removed.clear()
+        if self._pending:
+            index = [i for (i, _, _) in self._pending]
+            values = ColumnBuilder()
+            infos = ColumnBuilder()
+            for (_, flat_value, flat_info) in self._pending:
+                values.append(flat_value.items())
+                infos.append(flat_info.items())
+            self._value_df = pandas.concat(
+                [self._value_df,
+                 values.to_dataframe(index, sparse=self._sparse)])
+            self._info_df = pandas.concat(
+                [self._info_df, infos.to_dataframe(index)])
+            del self._pending[:]
+
+    def _row(self, index):
+        """
+        Flattened value dict of the record at `index` in `_value_df`.
+        """
+        if self._value_df is None:
+            row = self._values.row(index)
+        else:
+            import pandas
+            row = {k: v for (k, v) in self._value_df.loc[index].items()
+                   if v is not pandas.NA}
+        return {k: v for (k, v) in row.items()
+                if not (isinstance(v, float) and v != v)}
+
+    def _first_index(self):
+        if self._value_df is None:
+            for i in range(self._values.nrows):
+                if i not in self._removed:
+                    return i
+            return None
+        self._flush()
+        if len(self._value_df):
+            return self._value_df.index[0]
+        return None
+
+    def _get_counter(self):
+        if self._counter is None:
+            if self._value_df is None:
+                builder = self._values
+                counter = DifferentKeysCounter.from_columns(
+                    builder.nrows, zip(builder.keys, builder.values),
+                    **self._kwds)
+            else:
+                self._flush()
+                counter = DifferentKeysCounter.from_dataframe(
+                    self._value_df, **self._kwds)
+            self._reference_index = self._first_index()
+            if self._reference_index is not None:
+                counter.set_reference(self._row(self._reference_index))
+            self._counter = counter
+        return self._counter
+
+    def _changed(self):
+        self._keys = None
+        self._diff_df = None
+
+    def add(self, value_dict, info_dict={}):
+        """
+        Add a record and return its index.
+
+        The different keys are updated in time proportional to the
+        size of `value_dict`.  The new row is appended to `value_df`
+        and `info_df` only when they are accessed next time.  Only
+        `keys` is incremental; `diff_df` is rebuilt from the whole
+        `value_df` when accessed after `add` or `remove`.
+
+        >>> dd = diff_dicts([{'a': 1, 'b': 2}, {'a': 1, 'b': 2}])
+        >>> dd.keys
+        []
+        >>> dd.add({'a': 1, 'b': 3})
+        2
+        >>> dd.keys
+        [('b',)]
+        >>> dd.pretty_diff()
+           b
+        0  2
+        1  2
+        2  3
+
+        """
+        if self._pruned:
+            raise ValueError('Records cannot be added when prune=True.')
+        counter = self._get_counter()
+        flat_value = flatten_dict(value_dict)
+        flat_info = flatten_dict(info_dict)
+        self._move_info_values(self.info_keys, flat_value, flat_info)
+        index = self._next_index
+        self._next_index += 1
+        if self._value_df is None:
+            self._values.append(flat_value.items())
+            self._infos.append(flat_info.items())
+        else:
+            self._pending.append((index, flat_value, flat_info))
+        counter.add(flat_value)
+        if counter.count == 1:
+            self._reference_index = index
+            counter.set_reference(flat_value)
+        self._changed()
+        return index
+
+    def remove(self, index):
+        """
+        Remove the record at `index` (a label of `value_df.index`).
+
+        >>> dd = diff_dicts([{'a': 1}, {'a': 2}, {'a': 1}])
+        >>> dd.keys
+        [('a',)]
+        >>> dd.remove(1)
+        >>> dd.keys
+        []
+        >>> list(dd.value_df.index)
+        [0, 2]
+
+        """
+        counter = self._get_counter()
+        for (i, (pending_index, flat_value, _)) in enumerate(self._pending):
+            if pending_index == index:
+                del self._pending[i]
+                break
+        else:
+            if self._value_df is None:
+                exists = (isinstance(index, int) and
+                          0 <= index < self._values.nrows)
+            else:
+                exists = index in self._value_df.index
+            if index in self._removed or not exists:
+                raise KeyError(index)
+            flat_value = self._row(index)
+            self._removed.add(index)
+        counter.remove(flat_value)
+        if index == self._reference_index and (counter.rtol or counter.atol):
+            self._reference_index = self._first_index()
+            if self._reference_index is not None:
+                counter.set_reference(self._row(self._reference_index))
+        self._changed()
+
+    def summary(self, top=None):
+        """
+        Summarize the values of each of `keys` instead of listing them.
+
+        It returns a `pandas.DataFrame` indexed by the dotted keys with
+        the following columns:
+
+        count, missing
+            Number of the records with and without the key.
+        distinct
+            Number of the distinct values.
+        mode, mode_count
+            The most frequent value and its frequency.
+        differ
+            Number of the records whose value is not `mode`, including
+            the records without the key.
+        min, max
+            Range of the numbers (NaN if there are none).
+
+        The keys are ranked by `differ` in descending order and only
+        the first `top` keys are returned if given.  The values are
+        counted column by column with NumPy for numeric columns (see
+        `DifferentKeysCounter.from_dataframe`).
+
+        >>> dd = diff_dicts([{'a': 1, 'b': 'x'}, {'a': 2, 'b': 'x'},
+        ...                  {'a': 2}, {'a': 2, 'b': 'x'}])
+        >>> summary = dd.summary().reset_index()
+        >>> summary[['key', 'count', 'missing', 'distinct', 'mode', 'differ']]
+          key  count  missing  distinct mode  differ
+        0   a      4        0         2    2       1
+        1   b      3        1         1    x       1
+        >>> summary[['key', 'min', 'max']]
+          key  min  max
+        0   a  1.0  2.0
+        1   b  NaN  NaN
+
+        """
+        import pandas
+        keys = []
+        rows = []
+        if self.keys:
+            values = self.diff_df['value']
+            for (key, column) in values.items():
+                keys.append(key)
+                rows.append(summarize_column(_present_values(column.values),
+                                             len(values)))
+        df = pandas.DataFrame(
+            rows, columns=SUMMARY_COLUMNS,
+            index=pandas.Index(pretty_column_keys(keys), name='key'))
+        df = df.sort_values('differ', ascending=False, kind='mergesort')
+        if top is not None:
+            df = df.iloc[:top]
+        return df
+
+    def groups(self, samples=3):
+        """
+        Group the records with the same values of all `keys`.
+
+        It returns a `pandas.DataFrame` with one row per distinct
+        combination of the values (a missing key is a value as well)
+        and the columns ``count`` (number of the records in the group),
+        ``samples`` (the index labels of `pretty_diff`, e.g., paths, of
+        the first `samples` records in the group) and then the keys.
+        A key named ``count`` or ``samples`` is prefixed by ``value.``.
+        The groups are sorted by ``count`` in descending order.
+
+        The records are grouped by hashing the values column by column
+        (see `group_codes`) rather than comparing them pairwise.
+
+        >>> dd = diff_dicts([{'a': 1, 'b': [0]}, {'a': 2, 'b': [0]},
+        ...                  {'a': 1, 'b': [0]}, {'a': 1}])
+        >>> dd.groups()
+           count samples  a    b
+        0      2  [0, 2]  1  [0]
+        1      1     [1]  2  [0]
+        2      1     [3]  1  NaN
+
+        """
+        if samples < 0:
+            raise ValueError('samples must not be negative: {!r}'
+                             .format(samples))
+        import numpy
+        import pandas
+        pdiff = self.pretty_diff()
+        columns = []
+        if self.keys:
+            columns = [column.values
+                       for (_, column) in self.diff_df['value'].items()]
+        codes = group_codes(columns, len(pdiff))
+        # Stable sorts keep the groups in the order of their first
+        # records when they have the same count:
+        order = numpy.argsort(codes, kind='stable')
+        (_, starts, counts) = numpy.unique(
+            codes[order], return_index=True, return_counts=True)
+        firsts = order[starts]
+        ranks = numpy.lexsort((firsts, -counts))
+        labels = pdiff.index.tolist()
+        df = pdiff.iloc[firsts[ranks]].reset_index(drop=True)
+        df.columns = ['value.' + name if name in ('count', 'samples')
+                      else name for name in df.columns]
+        df.insert(0, 'samples', pandas.Series(
+            [[labels[i] for i in order[start:start + min(n, samples)]]
+             for (start, n) in zip(starts[ranks], counts[ranks])],
+            dtype=object))
+        df.insert(0, 'count', counts[ranks])
+        return df
+
     def pretty_diff(self):
+        import pandas
         df = self.diff_df.copy()
 
         df_has_path = ('info', ('path',)) in df
@@ -114,6 +1452,183 @@ class DictsDiff(object):
         return df
 
 
+SUMMARY_COLUMNS = ['count', 'missing', 'distinct', 'mode', 'mode_count',
+                   'differ', 'min', 'max']
+
+
+def _present_values(column):
+    """
+    Drop the missing values of an array `column` other than NaN.
+
+    NaN is left to `summarize_column`.
+    """
+    import pandas
+    if _is_nullable(column):
+        return column[~column.isna()].to_numpy()
+    if isinstance(column, pandas.arrays.SparseArray):
+        return column.sp_values
+    return column
+
+
+def summarize_column(values, nrows):
+    """
+    Summarize the values of a key found in `nrows` records.
+
+    `values` is a list or an array of the values where NaN is treated
+    as missing.  See `DictsDiff.summary` for the fields returned as a
+    list in the order of `SUMMARY_COLUMNS`.  Numeric arrays are
+    summarized by NumPy and the other values are counted by
+    `collections.Counter` if they are hashable.
+
+    >>> summarize_column([1, 2, 2, float('nan')], 5)
+    [3, 2, 2, 2, 2, 3, 1, 2]
+    >>> summarize_column(['x', 'y', [1]], 3)
+    [3, 0, 3, 'x', 1, 2, nan, nan]
+
+    """
+    import numpy
+    nan = float('nan')
+    if isinstance(values, numpy.ndarray) and values.dtype != object:
+        if values.dtype.kind == 'f':
+            values = values[~numpy.isnan(values)]
+        uniques, counts = numpy.unique(values, return_counts=True)
+        if not len(values):
+            return [0, nrows, 0, None, 0, nrows, nan, nan]
+        i = int(counts.argmax())
+        if values.dtype.kind in 'iuf':
+            (lo, hi) = (uniques[0].item(), uniques[-1].item())
+        else:
+            (lo, hi) = (nan, nan)
+        return [len(values), nrows - len(values), len(uniques),
+                uniques[i].item(), int(counts[i]),
+                nrows - int(counts[i]), lo, hi]
+
+    if isinstance(values, numpy.ndarray):
+        values = values.tolist()  # much faster to iterate over
+    try:
+        counts = Counter(values)
+    except TypeError:
+        # Unhashable values such as lists:
+        items = [(v, n) for (n, v) in _count_values(values).values()]
+        types = set(type(v) for (v, _) in items)
+    else:
+        # Loop over the distinct values in Python only if needed:
+        types = set(map(type, counts))
+        if float in types:
+            for v in [v for v in counts if isinstance(v, float) and v != v]:
+                del counts[v]
+        items = counts.items()
+    count = sum(map(itemgetter(1), items))
+    (mode, mode_count) = max(items, key=itemgetter(1), default=(None, 0))
+    if types <= {str, bool, list, dict, type(None)}:
+        numbers = []
+    else:
+        numbers = [v for (v, _) in items if _is_number(v)]
+    return [
+        count,
+        nrows - count,
+        len(items),
+        mode,
+        mode_count,
+        nrows - mode_count,
+        min(numbers) if numbers else nan,
+        max(numbers) if numbers else nan,
+    ]
+
+
+def _factorize(values):
+    """
+    Codes of `values` by `pandas.factorize` with a code for the NAs.
+
+    The ``use_na_sentinel`` argument for this requires pandas 1.5.
+    """
+    import numpy
+    import pandas
+    (codes, uniques) = pandas.factorize(values)
+    codes = numpy.asarray(codes, dtype=numpy.int64)
+    codes[codes == -1] = len(uniques)
+    return codes
+
+
+def column_codes(column):
+    """
+    Integer codes of an array `column` which are equal iff the values are.
+
+    The missing values share a code different from `None` (JSON null).
+
+    >>> import numpy
+    >>> column_codes(numpy.array([1.5, float('nan'), 1.5, float('nan')]))
+    array([0, 1, 0, 1])
+    >>> column_codes(numpy.array(['x', None, float('nan'), [0], [0]],
+    ...                          dtype=object))
+    array([0, 1, 2, 3, 3])
+
+    """
+    import numpy
+    import pandas
+    dtype = getattr(column.dtype, 'subtype', column.dtype)  # sparse
+    if dtype != object:
+        return _factorize(column)
+    if isinstance(column, pandas.arrays.SparseArray):
+        column = column.to_dense()
+    # `pandas.factorize` mixes up `None` and NaN and fails with
+    # unhashable values such as lists.  Try it first as it is much
+    # faster than `_freeze`:
+    if not (column == None).any():  # noqa: E711
+        try:
+            return _factorize(column)
+        except TypeError:
+            pass
+    table = {}
+    return numpy.fromiter(
+        (table.setdefault(v, len(table)) for v in map(_freeze, column)),
+        dtype=numpy.int64, count=len(column))
+
+
+def group_codes(columns, nrows):
+    """
+    Integer codes of the `nrows` rows of `columns` which are equal iff
+    the rows are.
+
+    The codes of each column (`column_codes`) are combined into the
+    codes of the rows one column at a time.  Re-coding the combined
+    codes keeps them less than `nrows` so that they never overflow.
+
+    >>> import numpy
+    >>> group_codes([numpy.array([1, 2, 1, 1]),
+    ...              numpy.array(['x', 'x', 'x', 'y'])], 4)
+    array([0, 1, 0, 2])
+
+    """
+    import numpy
+    import pandas
+    codes = numpy.zeros(nrows, dtype=numpy.int64)
+    for column in columns:
+        codes = codes * nrows + column_codes(column)
+        codes = pandas.factorize(codes)[0].astype(numpy.int64)
+    return codes
+
+
+def diff_keys(dicts, flat=False, info_keys=[], rtol=0, atol=0):
+    """
+    Find keys whose values are different or missing in `dicts`.
+
+    It returns the same keys as `DictsDiff.keys` but only the first
+    dictionary is kept in memory and pandas is not used.  Hence
+    `dicts` can be a large iterator.
+
+    >>> diff_keys([{'a': 1, 'b': {'c': 2}}, {'a': 1, 'b': {'c': 3}}])
+    [('b', 'c')]
+    >>> diff_keys(iter([{'a': 1.0}, {'a': 1.001}]), atol=1e-2)
+    []
+
+    """
+    tracker = DifferentKeysTracker(rtol=rtol, atol=atol, ignore=info_keys)
+    for dct in dicts:
+        tracker.add(dct if flat else flatten_dict(dct))
+    return sorted(tracker.keys)
+
+
 def diff_dicts(value_dicts, **kwds):
     value_dicts = list(value_dicts)
     info_dicts = [{}] * len(value_dicts)
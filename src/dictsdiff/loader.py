@@ -2,7 +2,8 @@ import os
 import subprocess
 import sys
 
-from .core import DictsDiffError, DictsDiff, diff_dicts
+from .core import ColumnBuilder, DictsDiffError, DictsDiff, \
+    DifferentKeysTracker, diff_dicts, flatten_dict, iteritemsdeep
 
 
 class LoaderError(DictsDiffError):
@@ -10,21 +11,159 @@ class LoaderError(DictsDiffError):
 
 
 class YAMLShim(object):
+    """
+    YAML loader using libyaml's `CSafeLoader` when PyYAML is built with it.
+
+    `loader_name` is the name of the loader class in use.
+    """
+
     def __init__(self):
+        import yaml
         try:
-            from yaml import safe_load as load
+            from yaml import CSafeLoader as Loader
         except ImportError:
-            from yaml import load
+            try:
+                from yaml import SafeLoader as Loader
+            except ImportError:
+                from yaml import Loader
+        self.yaml = yaml
+        self.Loader = Loader
+        self.loader_name = Loader.__name__
+
+    def load(self, file):
+        return self.yaml.load(file, Loader=self.Loader)
+
+    def load_all(self, file):
+        return list(self.yaml.load_all(file, Loader=self.Loader))
+
+
+JSON_BACKENDS = ('orjson', 'simdjson', 'ujson', 'json')
+
+
+class JSONBackend(object):
+    """
+    JSON decoder using one of `JSON_BACKENDS`.
+
+    Files should be opened in binary mode so that the data is passed
+    to the decoder without decoding it to `str` first.  When a
+    third-party decoder rejects the data (e.g., ``NaN`` literals or
+    integers wider than 64 bits), it is decoded again by the standard
+    `json` module.  orjson does not reject but reads integers wider
+    than 64 bits as floats, losing the precision.  So the data with a
+    long integer literal (see `has_long_integer`) is decoded by the
+    standard `json` module without trying orjson.
+    """
+
+    def __init__(self, name):
+        import json
+        if name == 'json':
+            self.loads = json.loads
+        else:
+            fast_loads = __import__(name).loads
+            lossy = name == 'orjson'
+
+            def loads(data):
+                if lossy and has_long_integer(data):
+                    return json.loads(data)
+                try:
+                    return fast_loads(data)
+                except (ValueError, RuntimeError):
+                    return json.loads(data)
+
+            self.loads = loads
+        self.name = name
+
+    def load(self, file):
+        return self.loads(file.read())
+
+
+_long_integer_pattern = r'(?<![0-9.eE+-])-?[0-9]{19,}(?![0-9.eE])'
+_long_integer = {
+    str: (str.maketrans('123456789', '0' * 9), '0' * 19,
+          _long_integer_pattern),
+    bytes: (bytes.maketrans(b'123456789', b'0' * 9), b'0' * 19,
+            _long_integer_pattern.encode('ascii')),
+}
 
-        self.load = load
+
+def has_long_integer(data):
+    """
+    Check if JSON `data` may have an integer which does not fit in 64 bits.
+
+    It looks for 19 or more digits not in a fraction or an exponent.
+    Digits in strings are false positives which only make the decoding
+    slower.
+
+    >>> has_long_integer(b'[123456789012345678901234567890]')
+    True
+    >>> has_long_integer('{"a": -12345678901234567890}')
+    True
+    >>> has_long_integer('[2.1234567890123456789, 1e-1234567890123456789]')
+    False
+
+    """
+    import re
+    (table, digits, pattern) = _long_integer[type(data)]
+    # Checking 19 digits in a row with `translate` is much faster than
+    # searching with the regular expression:
+    if digits not in data.translate(table):
+        return False
+    return re.search(pattern, data) is not None
+
+
+_json_backends = {}
+
+
+def get_json_backend(name=None):
+    """
+    Get a `JSONBackend`.  The fastest installed one is used by default.
+
+    >>> get_json_backend('json').name
+    'json'
+    >>> get_json_backend().name in JSON_BACKENDS
+    True
+
+    """
+    if name in (None, 'auto'):
+        name = 'auto'
+        candidates = JSON_BACKENDS
+    else:
+        if name not in JSON_BACKENDS:
+            raise LoaderError('Unknown JSON backend: {!r}'.format(name))
+        candidates = [name]
+    try:
+        return _json_backends[name]
+    except KeyError:
+        pass
+    for candidate in candidates:
+        try:
+            backend = JSONBackend(candidate)
+            break
+        except ImportError:
+            continue
+    else:
+        raise LoaderError('JSON backend {} is not installed'.format(name))
+    _json_backends[name] = backend
+    return backend
 
 
-def param_module(path):
+def describe_backends(json_backend=None):
+    """
+    Describe the libraries used for loading files.
+    """
+    lines = ['JSON: {}'.format(get_json_backend(json_backend).name)]
+    try:
+        lines.append('YAML: {}'.format(YAMLShim().loader_name))
+    except ImportError:
+        lines.append('YAML: (PyYAML is not installed)')
+    return '\n'.join(lines)
+
+
+def param_module(path, json_backend=None):
     if path.lower().endswith(('.yaml', '.yml')):
         return YAMLShim(), ''
     elif path.lower().endswith('.json'):
-        import json
-        return json, ''
+        return get_json_backend(json_backend), 'b'
     elif path.lower().endswith(('.pickle', '.pkl')):
         try:
             import cPickle as pickle
@@ -39,31 +178,42 @@ def param_module(path):
             'data format of {!r} is not supported'.format(path))
 
 
-def load_any_file(path):
+def load_any_file(path, json_backend=None):
     """
     Load data from given path; data format is determined by file extension
     """
-    import json
-    try:
-        from json import JSONDecodeError
-    except ImportError:
-        JSONDecodeError = ValueError  # Python 2
+    documents = load_documents(path, json_backend)
+    if not documents:
+        raise LoaderError('No document found in {}'.format(path))
+    if len(documents) > 1:
+        raise LoaderError('Multiple documents found in {}'.format(path))
+    return documents[0]
+
 
+def load_documents(path, json_backend=None):
+    """
+    Load a list of documents from `path`.
+
+    Only YAML files can have multiple (or zero) documents.  Other
+    files always have one document.
+    """
     try:
-        module, mode = param_module(path)
+        module, mode = param_module(path, json_backend)
     except LoaderError as err:
         # Try to load as JSON anyway:
         try:
-            with open(path, 'r') as f:
-                return json.load(f)
-        except (OSError, IOError, JSONDecodeError):
+            with open(path, 'rb') as f:
+                return [get_json_backend(json_backend).load(f)]
+        except (OSError, IOError, ValueError):
             pass
         if sys.version_info[0] == 2:
             raise err
         raise
 
     with open(path, 'r' + mode) as f:
-        return module.load(f)
+        if hasattr(module, 'load_all'):
+            return module.load_all(f)
+        return [module.load(f)]
 
 
 def destruct_path(path):
@@ -75,40 +225,293 @@ def destruct_path(path):
     return filepath, jspath
 
 
-def load_any(path):
+_jspath_exprs = {}
+
+
+def compile_jspath(jspath):
+    """
+    Parse JSONPath `jspath`.  Parsed expressions are memoized.
+    """
+    try:
+        return _jspath_exprs[jspath]
+    except KeyError:
+        from jsonpath_rw import parse
+        expr = _jspath_exprs[jspath] = parse(jspath)
+        return expr
+
+
+def format_match_path(full_path):
+    """
+    Format `full_path` of a `jsonpath_rw` match as a JSONPath.
+
+    >>> from jsonpath_rw import parse
+    >>> [format_match_path(m.full_path)
+    ...  for m in parse('$.a[*].b').find({'a': [{'b': 1}, {'b': 2}]})]
+    ['$.a[0].b', '$.a[1].b']
+
+    """
+    path = str(full_path)
+    if path == '$':
+        return path
+    return '$.' + path.replace('.[', '[')
+
+
+def find_jspath_matches(root, jspath, filepath):
+    """
+    Find all objects at `jspath` in `root` as ``(match_path, value)``.
+
+    `match_path` is the full path of the object (see
+    `format_match_path`).  It is an error if nothing is found.
+    """
+    matches = compile_jspath(jspath).find(root)
+    if not matches:
+        raise LoaderError(
+            'No object found at {} in {}'.format(jspath, filepath))
+    return [(format_match_path(m.full_path), m.value) for m in matches]
+
+
+def load_any(path, json_backend=None):
     filepath, jspath = destruct_path(path)
     if jspath:
-        from jsonpath_rw import parse
-        jspath_expr = parse(jspath)
-        root = load_any_file(filepath)
-        matches = list(jspath_expr.find(root))
-        if len(matches) == 0:
-            raise LoaderError(
-                'No object found at {} in {}'.format(jspath, filepath))
-        elif len(matches) != 1:
+        root = load_any_file(filepath, json_backend)
+        matches = find_jspath_matches(root, jspath, filepath)
+        if len(matches) != 1:
             raise LoaderError(
                 'Multiple objects found at {} in {}'.format(jspath, filepath))
-        return matches[0].value
+        return matches[0][1]
     else:
-        return load_any_file(filepath)
+        return load_any_file(filepath, json_backend)
 
 
-def transforming_loader(files, transform, transform_to):
-    module, mode = param_module('.' + transform_to)
-    universal_newlines = mode != 'b'
-    for path in files:
-        with open(os.devnull) as devnull:
-            proc = subprocess.Popen(
-                transform.format(path),
-                shell=True,
-                stdout=subprocess.PIPE,
-                stdin=devnull,
-                universal_newlines=universal_newlines)
-        yield module.load(proc.stdout)
-        proc.wait()
+def load_file_records(filepath, jspaths, json_backend=None):
+    """
+    Load records from `filepath` for each of `jspaths`, parsing it once.
 
+    A record is a tuple ``(document, match, value)``.  Each document
+    of a multi-document YAML file becomes a record and `document` is
+    its index.  Otherwise, there is only one document and its
+    `document` is `None`.  A JSONPath in `jspaths` (if not `None`) is
+    applied to each document and each object found becomes a record
+    whose `match` is the full path of the object (see
+    `find_jspath_matches`).  `match` is `None` if there is no
+    JSONPath.
 
-def to_info_dict(dictpath):
+    Returns
+    -------
+    records : list
+        A list of the lists of the records for each of `jspaths`.
+
+    """
+    documents = load_documents(filepath, json_backend)
+    if not documents:
+        raise LoaderError('No document found in {}'.format(filepath))
+    if len(documents) == 1:
+        roots = [(None, documents[0])]
+    else:
+        roots = list(enumerate(documents))
+    return [[(document, match, value)
+             for (document, root) in roots
+             for (match, value) in find_jspath_matches(
+                 root, jspath, filepath)]
+            if jspath else
+            [(document, None, root) for (document, root) in roots]
+            for jspath in jspaths]
+
+
+def check_single_matches(path, records):
+    """
+    Raise `LoaderError` if a JSONPath found multiple objects in a document.
+    """
+    documents = [document for (document, _, _) in records]
+    if len(set(documents)) != len(documents):
+        filepath, jspath = destruct_path(path)
+        raise LoaderError(
+            'Multiple objects found at {} in {}'.format(jspath, filepath))
+
+
+def run_command(command, load, text=False):
+    """
+    Run shell `command` and return ``load(stdout)`` of it.
+
+    `stdout` is a text file if `text` is true and a binary file
+    otherwise.  A non-zero exit status of the command is raised as
+    `LoaderError`.
+    """
+    with open(os.devnull) as devnull:
+        proc = subprocess.Popen(
+            command,
+            shell=True,
+            stdout=subprocess.PIPE,
+            stdin=devnull,
+            universal_newlines=text)
+    with proc:
+        try:
+            loaded = load(proc.stdout)
+        except Exception:
+            # Read the rest of the output so that the command does not
+            # block on writing to the pipe forever:
+            while proc.stdout.read(2 ** 16):
+                pass
+            # Failing to parse the output of a failed command is not
+            # interesting; report the exit status instead.
+            if proc.wait() == 0:
+                raise
+    if proc.returncode != 0:
+        raise LoaderError('Command {!r} exited with status {}.'
+                          .format(command, proc.returncode))
+    return loaded
+
+
+def run_transform(transform, module, mode, path):
+    """
+    Run command `transform` for `path` and load its output by `module`.
+
+    See `run_command` for the errors.
+    """
+    return run_command(transform.format(path), module.load,
+                       text=mode != 'b')
+
+
+def run_batch_transform(transform, loads, paths):
+    """
+    Run command `transform` for `paths` and load its ndjson output.
+
+    The ``{files}`` placeholder in `transform` is replaced by the
+    shell-quoted `paths`.  The command must print exactly one
+    dictionary per path in the same order.
+
+    >>> import json
+    >>> command = '''printf '{{"path": "%s"}}\\n' {files}'''
+    >>> run_batch_transform(command, json.loads, ['a b', 'c'])
+    [{'path': 'a b'}, {'path': 'c'}]
+    >>> run_batch_transform('echo 1', json.loads, ['a', 'b'])
+    Traceback (most recent call last):
+      ...
+    dictsdiff.loader.LoaderError: Command 'echo 1' printed 1 lines for 2 files.
+
+    """
+    import shlex
+    command = transform.format(files=' '.join(map(shlex.quote, paths)))
+    loaded = run_command(command,
+                         lambda stdout: list(map(loads, _nonblank(stdout))))
+    if len(loaded) != len(paths):
+        raise LoaderError('Command {!r} printed {} lines for {} files.'
+                          .format(command, len(loaded), len(paths)))
+    return loaded
+
+
+def is_batch_transform(transform):
+    """
+    Check if command `transform` has the ``{files}`` placeholder.
+
+    `LoaderError` is raised if it has other placeholders as well.
+
+    >>> is_batch_transform("jq -c . {files}")
+    True
+    >>> is_batch_transform("jq -c '{{files: .x}}' {}")
+    False
+    >>> is_batch_transform("cat {} {files}")
+    Traceback (most recent call last):
+      ...
+    dictsdiff.loader.LoaderError: {files} cannot be mixed with other fields.
+
+    """
+    from string import Formatter
+    names = [name for (_, name, _, _) in Formatter().parse(transform)
+             if name is not None]
+    if 'files' not in names:
+        return False
+    if any(name != 'files' for name in names):
+        raise LoaderError('{files} cannot be mixed with other fields.')
+    return True
+
+
+def transforming_loader(files, transform, transform_to, json_backend=None,
+                        jobs=1, batch_size=256):
+    """
+    Yield dictionaries loaded from the outputs of `transform` commands.
+
+    If `transform` has the ``{files}`` placeholder (see
+    `is_batch_transform`), it is run once for each `batch_size` files
+    and its output is loaded as ndjson (see `run_batch_transform`).
+    Otherwise, it is run for each file given as ``{}`` and its output
+    is loaded as `transform_to`.
+
+    Up to `jobs` commands run concurrently (``0`` or `None` means the
+    number of CPUs) while the dictionaries are yielded in the order of
+    `files`.  See `run_transform` for the errors.
+    """
+    from functools import partial
+    batch = is_batch_transform(transform)
+    if batch:
+        if transform_to not in ('json', 'ndjson'):
+            raise LoaderError('Output of {{files}} command must be ndjson;'
+                              ' got {}.'.format(transform_to))
+        loads = get_json_backend(json_backend).loads
+        load = partial(run_batch_transform, transform, loads)
+        files = list(files)
+        items = [files[i:i + batch_size]
+                 for i in range(0, len(files), batch_size)]
+    else:
+        module, mode = param_module('.' + transform_to, json_backend)
+        load = partial(run_transform, transform, module, mode)
+        items = files
+
+    # Threads are enough since they mostly wait for the subprocesses.
+    for loaded in imap_threads(load, items, jobs):
+        if batch:
+            for dct in loaded:
+                yield dct
+        else:
+            yield loaded
+
+
+def imap_threads(func, iterable, jobs=1):
+    """
+    Lazily yield ``func(item)`` for `iterable` computed by `jobs` threads.
+
+    See `imap_bounded` for how many results are computed in advance.
+    """
+    if jobs == 1:
+        for item in iterable:
+            yield func(item)
+        return
+
+    from concurrent.futures import ThreadPoolExecutor
+    workers = jobs or os.cpu_count() or 1
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for result in imap_bounded(pool, func, iterable, 2 * workers):
+            yield result
+
+
+def imap_bounded(pool, func, iterable, window):
+    """
+    Like ``pool.map(func, iterable)`` but submit at most `window` ahead.
+
+    Unlike `concurrent.futures.Executor.map`, `iterable` is consumed
+    lazily and at most `window` results are kept in memory.
+
+    >>> from concurrent.futures import ThreadPoolExecutor
+    >>> with ThreadPoolExecutor(2) as pool:
+    ...     list(imap_bounded(pool, abs, range(0, -5, -1), 2))
+    [0, 1, 2, 3, 4]
+
+    """
+    from collections import deque
+    pending = deque()
+    try:
+        for item in iterable:
+            pending.append(pool.submit(func, item))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+def to_info_dict(dictpath, document=None, match=None):
     """
     Make an "info dict" which becomes a row of `.DictsDiff.info_df`.
 
@@ -117,29 +520,673 @@ def to_info_dict(dictpath):
     dictpath : str or tuple
         It can be a string which is a filepath or a 2-tupe of filepath
         and a JSONPath.
+    document : int or None
+        Index of the document in a multi-document YAML file.
+    match : str or None
+        Full path of the object found by the JSONPath.  It is used in
+        ``'path'`` instead of the JSONPath.
 
     Returns
     -------
     info_dict : dict
         It has a key ``'path'`` with a string value and a key
-        ``'filepath'`` wit has string value.
+        ``'filepath'`` wit has string value.  Key ``'jsonpath'``,
+        ``'document'`` and ``'match'`` are included if specified.
+
+    >>> to_info_dict(('a.yaml', '$.x'), 1) == dict(
+    ...     path='a.yaml#1 $.x', filepath='a.yaml', jsonpath='$.x', document=1)
+    True
+    >>> to_info_dict(('a.json', '$.x[*]'), match='$.x[0]') == dict(
+    ...     path='a.json $.x[0]', filepath='a.json', jsonpath='$.x[*]',
+    ...     match='$.x[0]')
+    True
 
     """
     filepath, jspath = destruct_path(dictpath)
+    info = dict(filepath=filepath)
+    path = filepath
+    if document is not None:
+        path = '{}#{}'.format(path, document)
+        info['document'] = document
     if jspath:
-        path = '{} {}'.format(filepath, jspath)
-        return dict(path=path, filepath=filepath, jsonpath=jspath)
+        path = '{} {}'.format(path, match or jspath)
+        info['jsonpath'] = jspath
+    if match is not None:
+        info['match'] = match
+    info['path'] = path
+    return info
+
+
+def load_flat_file_records(filepath, jspaths, json_backend=None):
+    """
+    Like `load_file_records` but values are flattened by `.flatten_dict`.
+    """
+    return [[(document, match, flatten_dict(value))
+             for (document, match, value) in records]
+            for records in load_file_records(filepath, jspaths, json_backend)]
+
+
+def choose_executor(files):
+    """
+    Choose a pool type suitable for loading `files`.
+
+    Parsing JSON is I/O-bound enough to benefit from threads while
+    other formats (YAML, pickle and TOML) are parsed by CPU-bound
+    pure-Python code which requires processes to run in parallel.
+
+    >>> choose_executor(['a.json', ('b.json', '$.x')])
+    'thread'
+    >>> choose_executor(['a.json', 'b.yaml'])
+    'process'
+
+    """
+    for path in files:
+        filepath, _ = destruct_path(path)
+        try:
+            module, _ = param_module(filepath)
+        except LoaderError:
+            continue  # loaded as JSON
+        if not isinstance(module, JSONBackend):
+            return 'process'
+    return 'thread'
+
+
+def map_files(func, files, jobs=1, executor=None):
+    """
+    Apply `func` to each of `files` using up to `jobs` workers.
+
+    Parameters
+    ----------
+    func : callable
+        A function taking an element of `files`.  It must be picklable
+        (e.g., defined at module level) when a process pool is used.
+    files : list
+    jobs : int or None
+        Number of workers.  When it is 1, `func` is called serially in
+        the current thread.  ``0`` or `None` means the number of CPUs.
+    executor : {None, 'thread', 'process'}
+        Pool type.  If `None`, it is determined by `choose_executor`.
+
+    Returns
+    -------
+    results : list
+        Results of `func` in the same order as `files`.
+
+    """
+    files = list(files)
+    if jobs == 1 or len(files) <= 1:
+        return list(map(func, files))
+
+    from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+    workers = jobs or os.cpu_count() or 1
+    if executor is None:
+        executor = choose_executor(files)
+    if executor == 'thread':
+        pool = ThreadPoolExecutor(max_workers=workers)
+    elif executor == 'process':
+        pool = ProcessPoolExecutor(max_workers=workers)
     else:
-        return dict(path=filepath, filepath=filepath)
+        raise ValueError('Unknown executor: {!r}'.format(executor))
+
+    # Batch submissions to processes so that the IPC overhead is
+    # amortized for a large number of small files:
+    chunksize = max(1, len(files) // (4 * workers))
+    with pool:
+        return list(pool.map(func, files, chunksize=chunksize))
 
 
-def diff_files(files, **kwds):
+def _call_with_group(func, group):
+    return func(*group)
+
+
+def map_file_groups(func, files, jobs=1, executor=None):
+    """
+    Call ``func(filepath, jspaths)`` once for each file in `files`.
+
+    The elements of `files` are grouped by the file paths so that each
+    file is loaded only once even if multiple JSONPaths refer to it.
+    `func` must return a list of results for each of `jspaths`.  See
+    `map_files` for `jobs` and `executor`.
+
+    Returns
+    -------
+    results : list
+        Results for each of `files` in the same order.
+
+    """
+    from functools import partial
+    groups = {}
+    for (i, path) in enumerate(files):
+        filepath, jspath = destruct_path(path)
+        groups.setdefault(filepath, []).append((i, jspath))
+    grouped = map_files(
+        partial(_call_with_group, func),
+        [(filepath, [jspath for (_, jspath) in members])
+         for (filepath, members) in groups.items()],
+        jobs=jobs, executor=executor)
+    results = [None] * len(files)
+    for (members, group_results) in zip(groups.values(), grouped):
+        for ((i, _), result) in zip(members, group_results):
+            results[i] = result
+    return results
+
+
+def load_flat_files(files, jobs=1, executor=None, cache=None,
+                    json_backend=None):
+    """
+    Load and flatten records from `files`, possibly using `cache`.
+
+    See `map_files` for `jobs` and `executor`, `.cache.as_cache` for
+    `cache` and `get_json_backend` for `json_backend`.  Only the files
+    not found in `cache` are loaded and each of them is parsed once
+    (see `map_file_groups`).
+
+    Returns
+    -------
+    records : list
+        A list of the records of each file as returned (for each
+        JSONPath) by `load_flat_file_records`.
+    """
+    from functools import partial
+    from .cache import as_cache
     files = list(files)
-    value_dicts = list(map(load_any, files))
-    info_dicts = list(map(to_info_dict, files))
-    return DictsDiff(value_dicts, info_dicts, **kwds)
+    cache = as_cache(cache)
+    load = partial(load_flat_file_records, json_backend=json_backend)
+    if cache is None:
+        return map_file_groups(load, files, jobs=jobs, executor=executor)
+
+    backend = get_json_backend(json_backend).name
+    results = [cache.get(*destruct_path(path), backend=backend)
+               for path in files]
+    missing = [i for (i, records) in enumerate(results) if records is None]
+    stats = [os.stat(destruct_path(files[i])[0]) for i in missing]
+    loaded = map_file_groups(load, [files[i] for i in missing],
+                             jobs=jobs, executor=executor)
+    for (i, stat, records) in zip(missing, stats, loaded):
+        filepath, jspath = destruct_path(files[i])
+        cache.put(filepath, jspath, records, stat, backend=backend)
+        results[i] = records
+    if missing:
+        cache.evict()
+    return results
+
+
+def diff_files(files, jobs=1, executor=None, cache=None, json_backend=None,
+               prune=False, expand=False, **kwds):
+    """
+    Load dictionaries from `files` and compare them.
+
+    Each document in multi-document YAML files is compared as a
+    separate dictionary.  If `expand` is true, each object found by a
+    JSONPath (e.g., ``$.runs[*]``) is compared as a separate dictionary
+    and its full path is stored in the ``'match'`` key of the info
+    dict (see `to_info_dict`).  Otherwise, it is an error if a
+    JSONPath finds multiple objects.
+
+    Files are loaded and flattened in parallel when `jobs` is not 1.
+    See `load_flat_files` for `jobs`, `executor`, `cache` and
+    `json_backend`.  If `prune` is true, the subtrees equal in all
+    files are not flattened (see `.flatten_differing`); `cache` is not
+    used in this case since it stores flattened dictionaries.  Other
+    keyword arguments are passed to `.DictsDiff`.
+    """
+    from functools import partial
+    files = list(files)
+    if prune:
+        load = partial(load_file_records, json_backend=json_backend)
+        results = map_file_groups(load, files, jobs=jobs, executor=executor)
+    else:
+        results = load_flat_files(files, jobs=jobs, executor=executor,
+                                  cache=cache, json_backend=json_backend)
+    value_dicts = []
+    info_dicts = []
+    for (path, records) in zip(files, results):
+        if not expand:
+            check_single_matches(path, records)
+        for (document, match, flat) in records:
+            value_dicts.append(flat)
+            info_dicts.append(to_info_dict(path, document,
+                                           match if expand else None))
+    return DictsDiff(value_dicts, info_dicts, flat=not prune, prune=prune,
+                     **kwds)
+
+
+def diff_ndjson(stream, streaming=False, json_backend=None, prune=False,
+                **kwds):
+    """
+    Compare dictionaries in Newline delimited JSON `stream`.
+
+    `stream` yields lines as `str` or, preferably, `bytes`.  Blank
+    lines are ignored.  If `streaming` is true, use
+    `diff_ndjson_streaming` to bound the memory usage; `prune` is
+    ignored in this case since only the values of the different keys
+    are kept anyway.  See `get_json_backend` for `json_backend`.
+    Other keyword arguments are passed to `.DictsDiff`.
+    """
+    if streaming:
+        return diff_ndjson_streaming(stream, json_backend=json_backend,
+                                     **kwds)
+    loads = get_json_backend(json_backend).loads
+    return diff_dicts(map(loads, _nonblank(stream)), prune=prune, **kwds)
+
+
+def scan_ndjson_keys(stream, info_keys=[], rtol=0, atol=0,
+                     json_backend=None):
+    """
+    Find different keys in ndjson `stream` in a single pass.
+
+    Returns
+    -------
+    tracker : `.DifferentKeysTracker`
+
+    """
+    loads = get_json_backend(json_backend).loads
+    tracker = DifferentKeysTracker(rtol=rtol, atol=atol, ignore=info_keys)
+    for line in _nonblank(stream):
+        tracker.add(flatten_dict(loads(line)))
+    return tracker
+
+
+def ndjson_byte_ranges(path, nranges):
+    """
+    Split the ndjson file at `path` into at most `nranges` byte ranges.
+
+    The ranges are ``(start, end)`` pairs which start at the beginning
+    of lines and cover the whole file.
+
+    >>> import os, tempfile
+    >>> with tempfile.NamedTemporaryFile('wb', delete=False) as file:
+    ...     _ = file.write(b'{"a": 1}\\n{"a": 2}\\n{"a": 3}\\n')
+    >>> ndjson_byte_ranges(file.name, 2)
+    [(0, 18), (18, 27)]
+    >>> ndjson_byte_ranges(file.name, 10)
+    [(0, 9), (9, 18), (18, 27)]
+    >>> os.remove(file.name)
+
+    """
+    size = os.path.getsize(path)
+    bounds = [0]
+    with open(path, 'rb') as file:
+        for i in range(1, nranges):
+            pos = size * i // nranges
+            if pos <= bounds[-1]:
+                continue
+            # Move to the beginning of the line after `pos - 1`:
+            file.seek(pos - 1)
+            file.readline()
+            pos = file.tell()
+            if bounds[-1] < pos < size:
+                bounds.append(pos)
+    bounds.append(size)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def read_lines(file, end, chunksize=2 ** 20):
+    """
+    Read lines from the current position of binary `file` up to `end`.
+
+    The bytes are read in chunks of `chunksize` and split into lines
+    by `bytes.split`.  Empty lines are skipped.
+    """
+    rest = b''
+    remaining = end - file.tell()
+    while remaining > 0:
+        chunk = file.read(min(chunksize, remaining))
+        if not chunk:
+            break
+        remaining -= len(chunk)
+        lines = (rest + chunk).split(b'\n')
+        rest = lines.pop()
+        for line in lines:
+            if line.strip():
+                yield line
+    if rest.strip():
+        yield rest
+
+
+def load_ndjson_range(path, byte_range, json_backend=None):
+    """
+    Load and flatten the dictionaries in `byte_range` of file `path`.
+
+    Returns
+    -------
+    values : `.ColumnBuilder`
+
+    """
+    loads = get_json_backend(json_backend).loads
+    values = ColumnBuilder()
+    start, end = byte_range
+    with open(path, 'rb') as file:
+        file.seek(start)
+        for line in read_lines(file, end):
+            values.append(iteritemsdeep(loads(line)))
+    return values
+
+
+def scan_ndjson_range(path, byte_range, json_backend=None, **kwds):
+    """
+    Like `scan_ndjson_keys` but scan `byte_range` of file `path`.
+    """
+    start, end = byte_range
+    with open(path, 'rb') as file:
+        file.seek(start)
+        return scan_ndjson_keys(read_lines(file, end),
+                                json_backend=json_backend, **kwds)
+
+
+def map_ndjson_ranges(func, path, jobs, **kwds):
+    """
+    Call ``func(path, byte_range, **kwds)`` in worker processes.
+
+    The file at `path` is split by `ndjson_byte_ranges` into a few
+    ranges per worker so that the load is balanced.  See `map_files`
+    for `jobs`.
+    """
+    from functools import partial
+    workers = jobs or os.cpu_count() or 1
+    ranges = ndjson_byte_ranges(path, 4 * workers)
+    return map_files(partial(func, path, **kwds), ranges, jobs=jobs,
+                     executor='process')
+
+
+def diff_ndjson_file(path, jobs=1, streaming=False, json_backend=None,
+                     prune=False, info_keys=[], **kwds):
+    """
+    Compare dictionaries in the ndjson file at `path`.
+
+    If `jobs` is not 1, the file is split into byte ranges which are
+    parsed and flattened by worker processes (see `map_ndjson_ranges`).
+    Otherwise, or if `streaming` or `prune` is requested, it is
+    equivalent to `diff_ndjson`.
+    """
+    if jobs == 1 or streaming or prune:
+        with open(path, 'rb') as file:
+            return diff_ndjson(file, streaming=streaming,
+                               json_backend=json_backend, prune=prune,
+                               info_keys=info_keys, **kwds)
+    results = map_ndjson_ranges(load_ndjson_range, path, jobs,
+                                json_backend=json_backend)
+    values = results[0]
+    for other in results[1:]:
+        values.extend(other)
+    return DictsDiff.from_builders(values, ColumnBuilder(values.nrows),
+                                   info_keys=info_keys, **kwds)
+
+
+def scan_ndjson_file_keys(path, jobs=1, json_backend=None, **kwds):
+    """
+    Like `scan_ndjson_keys` but scan the file at `path` using `jobs`.
+
+    See `.DifferentKeysTracker.update` for how the results of the
+    workers are merged.
+    """
+    if jobs == 1:
+        with open(path, 'rb') as file:
+            return scan_ndjson_keys(file, json_backend=json_backend, **kwds)
+    trackers = map_ndjson_ranges(scan_ndjson_range, path, jobs,
+                                 json_backend=json_backend, **kwds)
+    tracker = trackers[0]
+    for other in trackers[1:]:
+        tracker.update(other)
+    return tracker
+
+
+TABLE_FORMATS = {
+    '.csv': 'csv',
+    '.tsv': 'tsv',
+    '.parquet': 'parquet',
+    '.arrow': 'arrow',
+    '.feather': 'arrow',
+}
+
+
+def table_format(path):
+    """
+    Guess the format of the table file at `path` from its extension.
+
+    >>> table_format('records.parquet')
+    'parquet'
+
+    """
+    ext = os.path.splitext(path)[1].lower()
+    try:
+        return TABLE_FORMATS[ext]
+    except KeyError:
+        raise LoaderError(
+            'table format of {!r} is not supported'.format(path))
+
+
+def column_key(name):
+    """
+    Convert a dotted column name to a key as in `.iteritemsdeep`.
+
+    >>> column_key('a.b')
+    ('a', 'b')
+
+    """
+    return tuple(name.split('.'))
+
+
+def is_projected(key, columns):
+    """
+    Check if `key` is one of `columns` or below one of them.
+
+    >>> is_projected(('a', 'b'), [('a',)])
+    True
+    >>> is_projected(('ab',), [('a',)])
+    False
+
+    """
+    return columns is None or any(key[:len(c)] == c for c in columns)
+
+
+def flat_field_names(field):
+    """
+    Names of the leaves of a `pyarrow.Field` as flattened by pyarrow.
+    """
+    import pyarrow
+    if not pyarrow.types.is_struct(field.type):
+        return [field.name]
+    return [field.name + '.' + name
+            for i in range(field.type.num_fields)
+            for name in flat_field_names(field.type[i])]
+
+
+def read_arrow_table(path, format, columns=None):
+    """
+    Read a Parquet or Arrow IPC file with the struct columns flattened.
+
+    Only the top-level columns having some of `columns` (after
+    flattening, see `is_projected`) are read.
+    """
+    try:
+        import pyarrow
+    except ImportError:
+        raise LoaderError('pyarrow is required for loading {!r}'
+                          .format(path))
+    if format == 'parquet':
+        import pyarrow.parquet
+        read_table = pyarrow.parquet.read_table
+        read_schema = pyarrow.parquet.read_schema
+    else:
+        import pyarrow.feather
+        import pyarrow.ipc
+        read_table = pyarrow.feather.read_table
+
+        def read_schema(path):
+            # Feather (V2) is the Arrow IPC file format:
+            with pyarrow.ipc.open_file(path) as reader:
+                return reader.schema
+    if columns is not None:
+        # A column name may have dots (e.g., "b.c") so that the
+        # top-level names cannot be found from `columns` only:
+        columns = [
+            field.name for field in read_schema(path)
+            if any(is_projected(column_key(name), columns)
+                   for name in flat_field_names(field))]
+    table = read_table(path, columns=columns)
+    while any(pyarrow.types.is_struct(field.type) for field in table.schema):
+        table = table.flatten()  # names the fields as "struct.field"
+    return table
+
+
+def load_table(path, format=None, columns=None):
+    """
+    Load the records in the table file at `path` into a `.ColumnBuilder`.
+
+    Each row is a record.  The dotted column names, including the
+    flattened fields of the struct columns, are mapped to the keys as
+    in `.iteritemsdeep`.  Null (empty in CSV) means a missing key.
+    Each column is converted as a whole without constructing
+    dictionaries.
+
+    Parameters
+    ----------
+    path : str
+    format : {'csv', 'tsv', 'parquet', 'arrow', None}
+        Guessed by `table_format` if not given.  Parquet and Arrow IPC
+        (Feather) files require pyarrow.
+    columns : list of tuples or None
+        Load only these keys and the keys below them.  The other
+        columns are not read (for CSV, not parsed).
+
+    """
+    import numpy
+    format = format or table_format(path)
+    values = ColumnBuilder()
+    if format in ('csv', 'tsv'):
+        import pandas
+        sep = ',' if format == 'csv' else '\t'
+        df = pandas.read_csv(
+            path, sep=sep,
+            usecols=lambda name: is_projected(column_key(name), columns))
+        # Integer columns with missing values are read as floats.  Read
+        # them again as text to find the columns of integer literals.
+        # (`read_csv(..., dtype_backend=...)` requires pandas 2.0 and
+        # `convert_dtypes` converts "1.0" to 1 as well.)
+        missing = df.isna().any()
+        floats = [name for name in df.columns
+                  if df[name].dtype.kind == 'f' and missing[name]]
+        if floats:
+            texts = pandas.read_csv(path, sep=sep, usecols=floats, dtype=str)
+        values.nrows = len(df)
+        for name in df.columns:
+            column = df[name]
+            present = column.notna().to_numpy()
+            if not present.any():
+                continue
+            column = column[present]
+            if name in floats:
+                numbers = pandas.to_numeric(texts[name][present])
+                if numbers.dtype.kind in 'iu':
+                    column = numbers
+            values.add_column(column_key(name),
+                              numpy.flatnonzero(present).tolist(),
+                              column.tolist())
+    else:
+        table = read_arrow_table(path, format, columns)
+        values.nrows = table.num_rows
+        for (name, column) in zip(table.column_names, table.columns):
+            key = column_key(name)
+            if not is_projected(key, columns):
+                continue
+            present = column.is_valid().to_numpy(zero_copy_only=False)
+            if not present.any():
+                continue
+            values.add_column(key, numpy.flatnonzero(present).tolist(),
+                              column.drop_null().to_pylist())
+    return values
+
+
+def diff_table_file(path, format=None, columns=None, info_keys=[],
+                    **kwds):
+    """
+    Compare the records in the table file at `path`.
+
+    See `load_table` for `format` and `columns`.  The `info_keys` are
+    loaded even if they are not in `columns`.
+
+    .. Run the code below in a clean temporary directory:
+       >>> getfixture('cleancwd')
+
+    >>> _ = open('records.csv', 'w').write('''\
+    ... a,b.c,b.d
+    ... 1,0,x
+    ... 1,1,
+    ... ''')
+    >>> dd = diff_table_file('records.csv')
+    >>> dd.keys
+    [('b', 'c'), ('b', 'd')]
+    >>> diff_table_file('records.csv', columns=[('a',), ('b', 'c')]).keys
+    [('b', 'c')]
+
+    """
+    if columns is not None:
+        columns = list(columns) + list(info_keys)
+    values = load_table(path, format=format, columns=columns)
+    return DictsDiff.from_builders(values, ColumnBuilder(values.nrows),
+                                   info_keys=info_keys, **kwds)
+
+
+def diff_ndjson_streaming(stream, info_keys=[], json_backend=None, **kwds):
+    """
+    Compare dictionaries in ndjson `stream` without loading all values.
+
+    The first pass over `stream` determines the different keys by
+    `scan_ndjson_keys`.  The second pass loads only the values of
+    those keys and `info_keys`.  If `stream` is not seekable (e.g., a
+    pipe), the lines are spilled to a temporary file during the first
+    pass.
+    """
+    import tempfile
+
+    loads = get_json_backend(json_backend).loads
+    seekable = getattr(stream, 'seekable', lambda: False)()
+    if seekable:
+        start = stream.tell()
+        spill = None
+        lines = stream
+    else:
+        spill = tempfile.TemporaryFile('w+b')
+        lines = _tee_lines(stream, spill)
+
+    try:
+        tracker = scan_ndjson_keys(lines, info_keys=info_keys,
+                                   json_backend=json_backend,
+                                   rtol=kwds.get('rtol', 0),
+                                   atol=kwds.get('atol', 0))
+        wanted = tracker.keys | set(info_keys)
+        if not wanted:
+            value_dicts = [{}] * tracker.count
+        else:
+            if spill is None:
+                stream.seek(start)
+                lines = stream
+            else:
+                spill.seek(0)
+                lines = spill
+            value_dicts = []
+            for line in _nonblank(lines):
+                flat = flatten_dict(loads(line))
+                value_dicts.append({k: v for k, v in flat.items()
+                                    if k in wanted})
+    finally:
+        if spill is not None:
+            spill.close()
+
+    info_dicts = [{}] * len(value_dicts)
+    return DictsDiff(value_dicts, info_dicts, info_keys=info_keys, flat=True,
+                     **kwds)
+
+
+def _nonblank(lines):
+    return (line for line in lines if line.strip())
 
 
-def diff_ndjson(stream, **kwds):
-    import json
-    return diff_dicts(map(json.loads, stream), **kwds)
+def _tee_lines(stream, file):
+    for line in stream:
+        data = line if isinstance(line, bytes) else line.encode('utf-8')
+        file.write(data)
+        if not data.endswith(b'\n'):
+            file.write(b'\n')
+        yield line
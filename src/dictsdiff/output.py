@@ -0,0 +1,316 @@
+"""
+Writers of the diff table.
+"""
+
+import json
+
+from .core import DictsDiffError, pretty_column_keys
+
+FORMATS = ('table', 'csv', 'tsv', 'ndjson', 'parquet', 'arrow')
+BINARY_FORMATS = ('parquet', 'arrow')
+
+
+def format_value(value):
+    """
+    Format a cell of the table as in pandas' text representation.
+
+    >>> format_value(float('nan'))
+    'NaN'
+    >>> format_value([1, 2])
+    '[1, 2]'
+
+    """
+    if isinstance(value, float) and value != value:
+        return 'NaN'
+    return str(value)
+
+
+def iter_row_chunks(df, cells=2 ** 16):
+    """
+    Yield ``(index, rows)`` for chunks of about `cells` cells of `df`.
+
+    `index` is a list of tuples of the index levels and `rows` is a
+    list of lists of the values.  Only one chunk is converted to Python
+    objects at a time.
+    """
+    chunksize = max(1, cells // max(1, df.shape[1]))
+    for start in range(0, len(df), chunksize):
+        chunk = df.iloc[start:start + chunksize]
+        index = chunk.index.tolist()
+        if chunk.index.nlevels == 1:
+            index = [(i,) for i in index]
+        yield (index, chunk.to_numpy(dtype=object).tolist())
+
+
+def column_headers(columns):
+    """
+    Return the header lines of `columns` as in ``print(df)``.
+
+    Each header line is a list of the labels of a level of `columns`.
+    As pandas does, the labels of the outer levels are blank where they
+    are the same as those of the previous column.
+
+    >>> import pandas
+    >>> column_headers(pandas.Index(['a', 1]))
+    [['a', '1']]
+    >>> column_headers(pandas.MultiIndex.from_tuples(
+    ...     [(1, 'x'), (2, 'y'), (2, 'z')]))
+    [['1', '2', ''], ['x', 'y', 'z']]
+
+    """
+    if columns.nlevels == 1:
+        return [[str(c) for c in columns]]
+    keys = columns.tolist()
+    headers = []
+    for level in range(columns.nlevels):
+        labels = [str(key[level]) for key in keys]
+        if level < columns.nlevels - 1:
+            for j in range(1, len(keys)):
+                if keys[j][:level + 1] == keys[j - 1][:level + 1]:
+                    labels[j] = ''
+        headers.append(labels)
+    return headers
+
+
+def write_table(df, file, width=None, cells=2 ** 16):
+    """
+    Write `df` to `file` as an aligned text table like ``print(df)``.
+
+    Unlike ``print(df)``, the whole table is never formatted in memory.
+    The column widths are found in a pre-pass over the chunks of about
+    `cells` cells and then the rows are formatted and written chunk by
+    chunk.  If `width` is given, the columns are split into blocks
+    fitting in `width` characters as pandas does.  The columns with
+    multiple levels (e.g., of the transposed diff with multiple info
+    keys) have a header line per level as given by `column_headers`.
+
+    >>> import sys
+    >>> import pandas
+    >>> df = pandas.DataFrame({'a': [1.5, None], 'bb': ['x', 'y']},
+    ...                       index=pandas.Index(['p', 'q'], name='path'))
+    >>> write_table(df, sys.stdout)
+            a  bb
+    path
+    p     1.5   x
+    q     NaN   y
+    >>> write_table(df, sys.stdout, width=10)
+            a  \\
+    path
+    p     1.5
+    q     NaN
+    <BLANKLINE>
+          bb
+    path
+    p      x
+    q      y
+
+    """
+    if df.shape[0] == 0 or df.shape[1] == 0:
+        file.write(str(df) + '\n')
+        return
+
+    names = ['' if n is None else str(n) for n in df.index.names]
+    corners = ['' if n is None else str(n) for n in df.columns.names]
+    headers = column_headers(df.columns)
+    index_widths = list(map(len, names))
+    index_widths[0] = max([index_widths[0]] + list(map(len, corners)))
+    widths = [max(map(len, labels)) for labels in zip(*headers)]
+    for (index, rows) in iter_row_chunks(df, cells):
+        for (part, part_widths) in [(index, index_widths), (rows, widths)]:
+            for (j, column) in enumerate(zip(*part)):
+                part_widths[j] = max(part_widths[j],
+                                     max(map(len, map(format_value, column))))
+
+    blocks = []
+    block = []
+    used = sum(index_widths) + len(index_widths) - 1
+    for j in range(len(widths)):
+        if block and width and used + 2 + widths[j] > width:
+            blocks.append(block)
+            block = []
+            used = sum(index_widths) + len(index_widths) - 1
+        block.append(j)
+        used += 2 + widths[j]
+    blocks.append(block)
+
+    def line(index, cells):
+        return (' '.join(v.ljust(w) for (v, w) in zip(index, index_widths))
+                + ''.join('  ' + v.rjust(widths[j]) for (j, v) in cells))
+
+    for (k, block) in enumerate(blocks):
+        if k > 0:
+            file.write('\n')
+        for (level, labels) in enumerate(headers):
+            header = line([corners[level]] + [''] * (len(names) - 1),
+                          [(j, labels[j]) for j in block])
+            if k < len(blocks) - 1 and level == 0:
+                header += '  \\'
+            file.write(header + '\n')
+        if any(names):
+            file.write(line(names, []).rstrip() + '\n')
+        for (index, rows) in iter_row_chunks(df, cells):
+            file.write(''.join(
+                line(list(map(format_value, i)),
+                     [(j, format_value(row[j])) for j in block]) + '\n'
+                for (i, row) in zip(index, rows)))
+
+
+def diff_table(dd):
+    """
+    Flatten `dd.diff_df` into a table for the machine-readable formats.
+
+    The info columns come first and then the value columns, named by
+    the dotted keys.  A value column whose name is also the name of an
+    info column is prefixed by ``value.``.
+
+    >>> from .core import DictsDiff
+    >>> dd = DictsDiff([{'a': 1, 'path': 0}, {'a': 2, 'path': 0}],
+    ...                [{'path': 'x'}, {'path': 'y'}])
+    >>> diff_table(dd)
+      path  a
+    0    x  1
+    1    y  2
+
+    """
+    df = dd.diff_df
+    info = [key for (group, key) in df.columns if group == 'info']
+    value = [key for (group, key) in df.columns if group == 'value']
+    info_names = pretty_column_keys(info)
+    value_names = [
+        'value.' + name if name in info_names else name
+        for name in pretty_column_keys(value)]
+    table = df[[('info', key) for key in info] +
+               [('value', key) for key in value]]
+    table.columns = info_names + value_names
+    return table.reset_index(drop=True)
+
+
+def _is_missing(value):
+    return value is None or (isinstance(value, float) and value != value)
+
+
+def encode_objects(df, mixed=False):
+    """
+    Encode containers in the object columns of `df` as JSON strings.
+
+    If `mixed` is true, the columns with values of different types
+    are encoded as well since the columnar formats require a single
+    type per column.  Missing values are kept as they are.
+
+    >>> import pandas
+    >>> df = pandas.DataFrame({'a': [[1], None], 'b': ['x', 1]})
+    >>> encode_objects(df).values.tolist()
+    [['[1]', 'x'], [None, 1]]
+    >>> encode_objects(df, mixed=True).values.tolist()
+    [['[1]', '"x"'], [None, '1']]
+
+    """
+    import pandas
+    df = df.copy()
+    for name in df.columns:
+        column = df[name]
+        if column.dtype != object:
+            continue
+        types = set(type(v) for v in column if not _is_missing(v))
+        if types & {list, dict} or (mixed and len(types) > 1):
+            df[name] = pandas.Series(
+                [None if _is_missing(v) else json.dumps(v) for v in column],
+                index=column.index, dtype=object)
+    return df
+
+
+def write_ndjson(df, file, cells=2 ** 16):
+    """
+    Write each row of `df` as a JSON object, omitting the missing values.
+
+    >>> import sys
+    >>> import pandas
+    >>> df = pandas.DataFrame({'a': [1, 2], 'b': [[1], None]})
+    >>> df['c'] = pandas.array([None, 3], dtype='Int64')
+    >>> write_ndjson(df, sys.stdout)
+    {"a": 1, "b": [1]}
+    {"a": 2, "b": null, "c": 3}
+
+    """
+    import pandas
+    names = list(df.columns)
+    for (_, rows) in iter_row_chunks(df, cells):
+        file.write(''.join(
+            json.dumps({
+                name: value for (name, value) in zip(names, row)
+                if value is not pandas.NA and
+                not (isinstance(value, float) and value != value)
+            }) + '\n'
+            for row in rows))
+
+
+def write_frame(df, file, format='table', width=None):
+    """
+    Write a `pandas.DataFrame` `df` to `file` in `format`.
+
+    ``'table'`` is the text table written by `write_table` (with the
+    `width`).  The index of `df` is written only in this format; the
+    other formats are for the table of records given by the columns.
+    See `write_diff` for `file`.
+    """
+    if format == 'table':
+        write_table(df, file, width=width)
+    elif format in ('csv', 'tsv'):
+        encode_objects(df).to_csv(
+            file, sep=',' if format == 'csv' else '\t', index=False)
+    elif format == 'ndjson':
+        write_ndjson(df, file)
+    elif format in BINARY_FORMATS:
+        try:
+            import pyarrow
+            import pyarrow.feather
+        except ImportError:
+            raise DictsDiffError(
+                'pyarrow is required for the {} format.'.format(format))
+        try:
+            arrow = pyarrow.Table.from_pandas(
+                encode_objects(df, mixed=True), preserve_index=False)
+        except (pyarrow.ArrowInvalid, pyarrow.ArrowTypeError) as err:
+            raise DictsDiffError(
+                'Cannot convert the diff to Arrow: {}'.format(err))
+        if format == 'parquet':
+            import pyarrow.parquet
+            pyarrow.parquet.write_table(arrow, file)
+        else:
+            pyarrow.feather.write_feather(arrow, file)
+    else:
+        raise ValueError('Unknown format: {!r}'.format(format))
+
+
+def write_diff(dd, file, format='table', width=None, transpose=False,
+               summary=False, top=None, group=False, samples=3):
+    """
+    Write the diff table of a `DictsDiff` `dd` to `file` in `format`.
+
+    `format` is one of `FORMATS`.  ``'table'`` is the text table of
+    `DictsDiff.pretty_diff` (transposed if `transpose` is true) written
+    by `write_table` and the others are written from `diff_table`.
+    `file` is a binary file or a path for `BINARY_FORMATS` (which
+    require pyarrow) and a text file otherwise.
+
+    If `summary` is true, `DictsDiff.summary` of the `top` keys is
+    written instead, with the keys in the "key" column except in the
+    ``'table'`` format.  If `group` is true, `DictsDiff.groups` with at
+    most `samples` samples is written instead.
+    """
+    if summary or group:
+        if summary:
+            df = dd.summary(top=top)
+            if format != 'table':
+                df = df.reset_index()
+        else:
+            df = dd.groups(samples=samples)
+        if transpose:
+            df = df.T
+    elif format == 'table':
+        df = dd.pretty_diff()
+        if transpose:
+            df = df.T
+    else:
+        df = diff_table(dd)
+    write_frame(df, file, format, width=width)
@@ -0,0 +1,106 @@
+import os
+
+from ..cache import LoadCache, as_cache, default_cache_dir
+from ..loader import diff_files
+
+
+def write_and_put(cache, paramfile, content, records):
+    paramfile.write(content)
+    stat = os.stat(str(paramfile))
+    cache.put(str(paramfile), None, records, stat)
+
+
+def test_hit_and_miss(tmpdir):
+    cache = LoadCache(str(tmpdir.join('cache')))
+    paramfile = tmpdir.join('param.json')
+    assert cache.get(str(paramfile)) is None  # no such file
+
+    write_and_put(cache, paramfile, '{"x": 1}', {('x',): 'cached'})
+    assert cache.get(str(paramfile)) == {('x',): 'cached'}
+    assert cache.get(str(paramfile), '$.x') is None
+
+    # Same size but different content:
+    paramfile.write('{"x": 2}')
+    os.utime(str(paramfile), ns=(0, 0))
+    assert cache.get(str(paramfile)) is None
+
+
+def test_touch(tmpdir):
+    cache = LoadCache(str(tmpdir.join('cache')))
+    paramfile = tmpdir.join('param.json')
+    write_and_put(cache, paramfile, '{"x": 1}', {('x',): 'cached'})
+    os.utime(str(paramfile), ns=(0, 0))
+    assert cache.get(str(paramfile)) == {('x',): 'cached'}
+    # The new modification time is recorded:
+    assert cache.get(str(paramfile)) == {('x',): 'cached'}
+
+
+def test_backend(tmpdir):
+    cache = LoadCache(str(tmpdir.join('cache')))
+    paramfile = tmpdir.join('param.json')
+    paramfile.write('{"x": 1}')
+    stat = os.stat(str(paramfile))
+    cache.put(str(paramfile), None, {('x',): 'orjson'}, stat,
+              backend='orjson')
+    assert cache.get(str(paramfile), backend='orjson') == {('x',): 'orjson'}
+    assert cache.get(str(paramfile), backend='json') is None
+
+
+def test_unwritable(tmpdir):
+    blocker = tmpdir.join('blocker')
+    blocker.write('')  # a file where the parent directory should be
+    cache = LoadCache(str(blocker.join('cache')))
+    paramfile = tmpdir.join('param.json')
+    write_and_put(cache, paramfile, '{"x": 1}', {('x',): 'cached'})
+    assert cache.get(str(paramfile)) is None
+
+    files = [str(paramfile)]
+    assert diff_files(files, cache=cache.directory).keys == []
+
+
+def test_write_error_removes_tmp(tmpdir, monkeypatch):
+    cache = LoadCache(str(tmpdir.join('cache')))
+
+    def replace(src, dst):
+        raise OSError('replace failed')
+
+    monkeypatch.setattr(os, 'replace', replace)
+    write_and_put(cache, tmpdir.join('param.json'), '{"x": 1}', {})
+    assert os.listdir(cache.directory) == []
+
+
+def test_evict(tmpdir):
+    cache = LoadCache(str(tmpdir.join('cache')))
+    files = [tmpdir.join('param{}.json'.format(i)) for i in range(3)]
+    for (i, paramfile) in enumerate(files):
+        write_and_put(cache, paramfile, '{"x": 1}', {('x',): i})
+        os.utime(cache.entry_path(str(paramfile)), (i, i))
+    cache.max_size = os.path.getsize(cache.entry_path(str(files[0]))) * 2
+    cache.evict()
+    assert cache.get(str(files[0])) is None
+    assert cache.get(str(files[1])) == {('x',): 1}
+    assert cache.get(str(files[2])) == {('x',): 2}
+
+
+def test_diff_files_with_cache(tmpdir):
+    files = []
+    for i in range(3):
+        paramfile = tmpdir.join('param{}.json'.format(i))
+        paramfile.write('{{"x": {}, "y": 0}}'.format(i))
+        files.append(str(paramfile))
+    cachedir = str(tmpdir.join('cache'))
+    desired = diff_files(files)
+    for _ in range(2):
+        actual = diff_files(files, cache=cachedir)
+        assert actual.keys == desired.keys
+        assert actual.diff_df.equals(desired.diff_df)
+    assert len(os.listdir(cachedir)) == 3
+
+
+def test_as_cache(monkeypatch):
+    monkeypatch.setenv('XDG_CACHE_HOME', '/xdg')
+    assert default_cache_dir() == os.path.join('/xdg', 'dictsdiff')
+    assert as_cache(None) is None
+    assert as_cache(False) is None
+    assert as_cache(True).directory == default_cache_dir()
+    assert as_cache('dir').directory == 'dir'
@@ -1,5 +1,7 @@
 from itertools import combinations_with_replacement
 import os
+import subprocess
+import sys
 
 import pytest
 
@@ -53,6 +55,10 @@ def test_parse_file_paths_all(maxlen=5):
     [],
     ['-T'],
     ['--transform', 'cat {}'],
+    ['--transform', 'for f in {files}; do cat $f; echo; done'],
+    ['--jobs', '2'],
+    ['--json-backend', 'json'],
+    ['--prune'],
 ])
 def test_main_smoke(tmpdir, options):
     paramfile1 = tmpdir.join('param1.json')
@@ -62,13 +68,201 @@ def test_main_smoke(tmpdir, options):
     main(options + [str(paramfile1), str(paramfile2)])
 
 
-def test_main_smoke_ndjson(tmpdir):
+def test_prune_nan(tmpdir, capsys):
+    paramfile1 = tmpdir.join('param1.json')
+    paramfile2 = tmpdir.join('param2.json')
+    paramfile1.write('{"a": NaN, "b": 1, "c": {"d": NaN}}')
+    paramfile2.write('{"a": NaN, "b": 2, "c": {"d": NaN}}')
+    args = ['--keys-only', '--json-backend', 'json',
+            str(paramfile1), str(paramfile2)]
+    main(args)
+    desired = capsys.readouterr().out
+    assert desired == 'a\nb\nc.d\n'
+    main(['--prune'] + args)
+    assert capsys.readouterr().out == desired
+
+
+def test_transpose_info_keys(tmpdir, capsys):
+    paramfile = tmpdir.join('param.ndjson')
+    paramfile.write('{"a": 1, "s": "x", "v": 1}\n'
+                    '{"a": 2, "s": "yy", "v": 2}\n')
+    main(['--ndjson', str(paramfile), '-T',
+          '--info-key', 'a', '--info-key', 's'])
+    assert capsys.readouterr().out == (
+        'a  1   2\n'
+        's  x  yy\n'
+        'v  1   2\n')
+
+
+@pytest.mark.parametrize('options, nentries', [
+    (['--cache-dir', '{cachedir}'], 2),
+    (['--cache-dir', '{cachedir}', '--no-cache'], 0),
+])
+def test_main_cache(tmpdir, options, nentries):
+    cachedir = tmpdir.join('cache')
+    cachedir.ensure(dir=True)
+    options = [o.format(cachedir=cachedir) for o in options]
+    test_main_smoke(tmpdir, options)
+    assert len(cachedir.listdir()) == nentries
+
+
+@pytest.mark.parametrize('options', [
+    [],
+    ['--streaming'],
+    ['--prune'],
+    ['--prune', '--streaming'],
+    ['--prune', '--keys-only'],
+    ['--jobs', '2'],
+    ['--jobs', '2', '--keys-only'],
+])
+def test_main_smoke_ndjson(tmpdir, options):
     paramfile = tmpdir.join('param.ndjson')
     paramfile.write('''
     {"x": 1}
     {"x": 2}
     '''.strip())
-    main(['--ndjson', str(paramfile)])
+    main(options + ['--ndjson', str(paramfile)])
+
+
+def test_keys_only(tmpdir, capsys):
+    paramfile1 = tmpdir.join('param1.json')
+    paramfile2 = tmpdir.join('param2.json')
+    paramfile1.write('{"x": 1, "y": {"z": 0}}')
+    paramfile2.write('{"x": 1, "y": {"z": 1}}')
+    main(['--keys-only', str(paramfile1), str(paramfile2)])
+    assert capsys.readouterr().out == 'y.z\n'
+
+    ndjson = tmpdir.join('param.ndjson')
+    ndjson.write(paramfile1.read() + '\n' + paramfile2.read() + '\n')
+    main(['--keys-only', '--ndjson', str(ndjson)])
+    assert capsys.readouterr().out == 'y.z\n'
+
+
+def test_expand(tmpdir, capsys):
+    paramfile = tmpdir.join('param.json')
+    paramfile.write('{"runs": [{"x": 1, "y": 0}, {"x": 2, "y": 0}]}')
+    main(['--expand', '--keys-only', str(paramfile), '$.runs[*]'])
+    assert capsys.readouterr().out == 'x\n'
+
+
+@pytest.mark.parametrize('ndjson', [False, True])
+def test_key_tolerances(tmpdir, capsys, ndjson):
+    paramfile1 = tmpdir.join('param1.json')
+    paramfile2 = tmpdir.join('param2.json')
+    paramfile1.write('{"x": 1.0, "y": {"z": 1.0}}')
+    paramfile2.write('{"x": 1.001, "y": {"z": 1.1}}')
+    files = [str(paramfile1), str(paramfile2)]
+    if ndjson:
+        ndjsonfile = tmpdir.join('param.ndjson')
+        ndjsonfile.write(paramfile1.read() + '\n' + paramfile2.read())
+        files = ['--ndjson', str(ndjsonfile)]
+    main(['--keys-only', '--atol', '0.01', '--key-atol', 'y.z=0.5'] + files)
+    assert capsys.readouterr().out == ''
+    main(['--keys-only', '--key-atol', 'y.z=0.5'] + files)
+    assert capsys.readouterr().out == 'x\n'
+    main(['--keys-only', '--atol', '0.01', '--key-rtol', '$.x=0'] + files)
+    assert capsys.readouterr().out == 'y.z\n'
+
+
+def test_invalid_key_tolerance(capsys):
+    with pytest.raises(SystemExit) as excinfo:
+        main(['--key-atol', 'x', os.devnull])
+    assert excinfo.value.code == 2
+    assert 'Invalid per-key tolerance' in capsys.readouterr().err
+
+
+@pytest.mark.parametrize('output_format, desired', [
+    ('csv', 'filepath,path,x,y\n'
+            'p1.json,p1.json,1,"[1, 2]"\n'
+            'p2.json,p2.json,2,\n'),
+    ('tsv', 'filepath\tpath\tx\ty\n'
+            'p1.json\tp1.json\t1\t[1, 2]\n'
+            'p2.json\tp2.json\t2\t\n'),
+    ('ndjson', '{"filepath": "p1.json", "path": "p1.json", "x": 1, '
+               '"y": [1, 2]}\n'
+               '{"filepath": "p2.json", "path": "p2.json", "x": 2}\n'),
+])
+@pytest.mark.parametrize('to_file', [False, True])
+def test_output_format(tmpdir, capsys, output_format, desired, to_file):
+    tmpdir.join('p1.json').write('{"x": 1, "y": [1, 2]}')
+    tmpdir.join('p2.json').write('{"x": 2}')
+    options = ['--output-format', output_format]
+    if to_file:
+        options += ['--output', str(tmpdir.join('output'))]
+    with tmpdir.as_cwd():
+        main(options + ['p1.json', 'p2.json'])
+    if to_file:
+        assert tmpdir.join('output').read() == desired
+    else:
+        assert capsys.readouterr().out == desired
+
+
+def test_summary(tmpdir, capsys):
+    tmpdir.join('p1.json').write('{"x": 1, "y": "a"}')
+    tmpdir.join('p2.json').write('{"x": 2, "y": "a"}')
+    tmpdir.join('p3.json').write('{"x": 2}')
+    with tmpdir.as_cwd():
+        main(['--summary', 'p1.json', 'p2.json', 'p3.json'])
+        assert capsys.readouterr().out == """\
+     count  missing  distinct  mode  mode_count  differ  min  max
+key
+x        3        0         2     2           2       1  1.0  2.0
+y        2        1         1     a           2       1  NaN  NaN
+"""
+        main(['--top', '1', '--output-format', 'csv',
+              'p1.json', 'p2.json', 'p3.json'])
+        assert capsys.readouterr().out == """\
+key,count,missing,distinct,mode,mode_count,differ,min,max
+x,3,0,2,2,2,1,1.0,2.0
+"""
+
+
+def test_group(tmpdir, capsys):
+    tmpdir.join('p1.json').write('{"x": 1, "y": "a"}')
+    tmpdir.join('p2.json').write('{"x": 2}')
+    tmpdir.join('p3.json').write('{"x": 1, "y": "a"}')
+    with tmpdir.as_cwd():
+        main(['--group', '--output-format', 'csv',
+              'p1.json', 'p2.json', 'p3.json'])
+        assert capsys.readouterr().out == """\
+count,samples,x,y
+2,"[""p1.json"", ""p3.json""]",1,a
+1,"[""p2.json""]",2,
+"""
+        with pytest.raises(SystemExit) as excinfo:
+            main(['--group', '--summary', 'p1.json', 'p2.json'])
+    assert excinfo.value.code == 2
+    assert '--group cannot be used' in capsys.readouterr().err
+
+
+@pytest.mark.parametrize('output_format', ['parquet', 'arrow'])
+def test_output_format_arrow(tmpdir, output_format):
+    pyarrow = pytest.importorskip('pyarrow')
+    import pyarrow.feather
+    import pyarrow.parquet
+    tmpdir.join('param1.json').write('{"x": 1, "y": [1, 2]}')
+    tmpdir.join('param2.json').write('{"x": 2, "y": "z"}')
+    output = str(tmpdir.join('output'))
+    with tmpdir.as_cwd():
+        main(['--output-format', output_format, '--output', output,
+              'param1.json', 'param2.json'])
+    if output_format == 'parquet':
+        table = pyarrow.parquet.read_table(output)
+    else:
+        table = pyarrow.feather.read_table(output)
+    assert table.column('x').to_pylist() == [1, 2]
+    assert table.column('y').to_pylist() == ['[1, 2]', '"z"']
+
+
+def test_table(tmpdir, capsys):
+    path = tmpdir.join('records.csv')
+    path.write('x,y.z\n1,0\n1,1\n')
+    main(['--keys-only', '--table', str(path)])
+    assert capsys.readouterr().out == 'y.z\n'
+    main(['--keys-only', '--table', str(path), '--column', 'x'])
+    assert capsys.readouterr().out == ''
+    main(['--table', str(path), '--info-key', 'x', '--output-format', 'csv'])
+    assert capsys.readouterr().out == 'x,y.z\n1,0\n1,1\n'
 
 
 def test_ndjson_and_files(capsys):
@@ -79,6 +273,47 @@ def test_ndjson_and_files(capsys):
     assert 'FILES and --ndjson are mutually exclusive.' in captured.err
 
 
+@pytest.mark.parametrize('jobs', ['-1', 'x'])
+def test_invalid_jobs(capsys, jobs):
+    with pytest.raises(SystemExit) as excinfo:
+        main(['--jobs', jobs, os.devnull])
+    assert excinfo.value.code == 2
+    assert 'non-negative integer' in capsys.readouterr().err
+
+
+@pytest.mark.parametrize('options', [['--group', '--samples', '-1'],
+                                     ['--top', '-1']])
+def test_invalid_group_summary_counts(capsys, options):
+    with pytest.raises(SystemExit) as excinfo:
+        main(options + [os.devnull])
+    assert excinfo.value.code == 2
+    assert 'non-negative integer' in capsys.readouterr().err
+
+
+@pytest.mark.parametrize('size', ['-1', '0'])
+def test_invalid_transform_batch_size(capsys, size):
+    with pytest.raises(SystemExit) as excinfo:
+        main(['--transform', 'cat {files}', '--transform-batch-size', size,
+              os.devnull])
+    assert excinfo.value.code == 2
+    assert 'positive integer' in capsys.readouterr().err
+
+
+@pytest.mark.parametrize('options', [
+    ['--output', 'out.csv', '--output-format', 'csv'],
+    ['--summary'],
+    ['--top', '1'],
+    ['--group'],
+])
+def test_keys_only_with_output_options(tmpdir, capsys, options):
+    with tmpdir.as_cwd():
+        with pytest.raises(SystemExit) as excinfo:
+            main(['--keys-only'] + options + [os.devnull])
+        assert not tmpdir.join('out.csv').check()
+    assert excinfo.value.code == 2
+    assert '--keys-only cannot be used' in capsys.readouterr().err
+
+
 def test_load_error(capsys, tmpdir):
     paramfile = tmpdir.join('file.!unknown_extension!')
     paramfile.write('!')  # invalid as JSON
@@ -87,3 +322,44 @@ def test_load_error(capsys, tmpdir):
     captured = capsys.readouterr()
     assert excinfo.value.code == 1
     assert 'is not supported' in captured.err
+
+
+def test_backends(capsys):
+    with pytest.raises(SystemExit) as excinfo:
+        main(['--backends'])
+    captured = capsys.readouterr()
+    assert excinfo.value.code == 0
+    assert 'JSON: ' in captured.out
+    assert 'YAML: ' in captured.out
+
+
+HEAVY_MODULES = ('numpy', 'pandas', 'yaml', 'toml', 'jsonpath_rw',
+                 'orjson', 'simdjson', 'ujson')
+
+
+@pytest.mark.parametrize('args', [
+    ['--version'],
+    ['--help'],
+    ['--keys-only', '--json-backend', 'json', '{param}', '{param}'],
+])
+def test_startup_imports(tmpdir, args):
+    paramfile = tmpdir.join('param.json')
+    paramfile.write('{"x": 1}')
+    args = [a.format(param=paramfile) for a in args]
+    # Heavy modules must be imported lazily so that ``dictsdiff
+    # --help`` etc. start quickly.
+    code = '\n'.join([
+        'import sys',
+        'from dictsdiff.cli import main',
+        'try:',
+        '    main({!r})'.format(args),
+        'except SystemExit:',
+        '    pass',
+        'sys.stderr.write(" ".join(sys.modules))',
+    ])
+    proc = subprocess.run([sys.executable, '-c', code],
+                          stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                          universal_newlines=True, check=True)
+    assert 'Traceback' not in proc.stderr
+    imported = set(proc.stderr.split())
+    assert imported.isdisjoint(HEAVY_MODULES)
@@ -1,22 +1,34 @@
 import pytest
 
-from ..core import DictsDiff, diff_dicts
+from ..core import DictsDiff, diff_dicts, diff_keys, different_keys
 
 
-@pytest.mark.parametrize('value_dicts, diff_keys', [
+@pytest.mark.parametrize('value_dicts, desired', [
     ([dict(a=1)], []),
     ([dict(a=1)] * 2, []),
     ([dict(a=1), dict(a=2)], ['a']),
     ([dict(a=1), dict(b=1)], ['a', 'b']),
     ([dict(a=[1]), dict(a=[1])], []),
     ([dict(a=[1]), dict(a=[2])], ['a']),
+    ([dict(a='x'), dict(a='x')], []),
+    ([dict(a='x'), dict(a='y')], ['a']),
+    ([dict(a='x'), dict(a='x'), dict()], ['a']),
+    ([dict(a=None), dict(a=None)], []),
+    ([dict(a=None), dict(a='x')], ['a']),
+    ([dict(a='x'), dict(a=None)], ['a']),
+    ([dict(a=None), dict()], ['a']),
+    ([dict(a=[1]), dict(a=None)], ['a']),
+    ([dict(a='x'), dict(a=1)], ['a']),
 ])
-def test_diff_flat_keys(value_dicts, diff_keys):
+def test_diff_flat_keys(value_dicts, desired):
+    desired = sorted((k,) for k in desired)
     dd = diff_dicts(value_dicts)
-    assert dd.keys == sorted((k,) for k in diff_keys)
+    assert dd.keys == desired
+    assert diff_keys(value_dicts) == desired
+    assert sorted(different_keys(dd.value_df)) == desired
 
 
-@pytest.mark.parametrize('value_dicts, diff_keys, rtol, atol', [
+@pytest.mark.parametrize('value_dicts, desired, rtol, atol', [
     ([dict(a=1.0)] * 2, [], 0, 0),
     ([dict(a=1.0), dict(a=0.999)], ['a'], 0, 0),
     ([dict(a=1.0), dict(a=0.999)], [], 1e-2, 0),
@@ -24,9 +36,13 @@ def test_diff_flat_keys(value_dicts, diff_keys):
     ([dict(a=1.0), dict(a=0.999)], ['a'], 1e-6, 0),
     ([dict(a=1.0), dict(a=0.999)], ['a'], 0, 1e-6),
 ])
-def test_float_diff_with_tol(value_dicts, diff_keys, rtol, atol):
+def test_float_diff_with_tol(value_dicts, desired, rtol, atol):
+    desired = sorted((k,) for k in desired)
     dd = diff_dicts(value_dicts, rtol=rtol, atol=atol)
-    assert dd.keys == sorted((k,) for k in diff_keys)
+    assert dd.keys == desired
+    assert diff_keys(value_dicts, rtol=rtol, atol=atol) == desired
+    assert sorted(different_keys(dd.value_df, rtol=rtol, atol=atol)) == \
+        desired
 
 
 def test_info_keys_with_nonempty_info_dicts():
@@ -76,3 +92,213 @@ def test_no_diff():
     dd = diff_dicts([d1, d1, d1])
     df = dd.pretty_diff()
     assert len(df.columns) == 0
+
+
+@pytest.mark.parametrize('rtol', [0, 1e-2])
+def test_incremental(rtol):
+    import random
+    rng = random.Random(0)
+    values = [0, 1, 1.001, 'x', None, [1], [2]]
+
+    def make():
+        return {k: rng.choice(values)
+                for k in rng.sample('abcd', rng.randint(0, 4))}
+
+    records = {i: make() for i in range(5)}
+    dd = diff_dicts(list(records.values()), rtol=rtol)
+    for step in range(100):
+        if records and rng.random() < 0.4:
+            index = rng.choice(sorted(records))
+            dd.remove(index)
+            del records[index]
+        else:
+            record = make()
+            records[dd.add(record)] = record
+        remaining = [records[i] for i in sorted(records)]
+        desired = diff_dicts(remaining, rtol=rtol)
+        assert dd.keys == desired.keys
+        if step % 7 == 0:
+            # Check sometimes so that pending rows are removed as well:
+            assert list(dd.value_df.index) == sorted(records)
+
+
+def test_incremental_info():
+    dd = DictsDiff([dict(a=1, i=0)], [dict(path='x')], info_keys=[('i',)])
+    dd.add(dict(a=2, i=1), dict(path='y'))
+    assert dd.keys == [('a',)]
+    df = dd.pretty_diff()
+    assert list(df.index) == [0, 1]
+    assert list(df['a']) == [1, 2]
+    with pytest.raises(KeyError):
+        dd.remove(2)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_prune(seed):
+    import random
+    rng = random.Random(seed)
+
+    def make(depth):
+        if depth == 0 or rng.random() < 0.3:
+            return rng.choice([0, 1, 1.0, 'x', None, [1]])
+        return {k: make(depth - 1)
+                for k in rng.sample('abc', rng.randint(0, 3))}
+
+    base = make(4)
+    if not isinstance(base, dict):
+        base = {'a': base}
+    value_dicts = []
+    for i in range(4):
+        dct = dict(base)
+        if rng.random() < 0.5:
+            dct[rng.choice('abcd')] = make(2)
+        value_dicts.append(dct)
+    dd = diff_dicts(value_dicts)
+    pruned = diff_dicts(value_dicts, prune=True)
+    assert pruned.keys == dd.keys
+    assert pruned.diff_df.equals(dd.diff_df)
+    with pytest.raises(ValueError):
+        pruned.add({})
+
+
+def test_prune_nan():
+    nan = float('nan')  # shared by the records as by the JSON decoder
+    value_dicts = [dict(a=nan, b=1, c=dict(d=nan)),
+                   dict(a=nan, b=2, c=dict(d=nan))]
+    dd = diff_dicts(value_dicts)
+    pruned = diff_dicts(value_dicts, prune=True)
+    assert dd.keys == [('a',), ('b',), ('c', 'd')]
+    assert pruned.keys == dd.keys
+
+
+def test_prune_info_keys():
+    dd = diff_dicts([dict(a=dict(b=1, c=0)), dict(a=dict(b=1, c=1))],
+                    info_keys=[('a', 'b')], prune=True)
+    df = dd.pretty_diff()
+    assert list(df.columns) == ['a.c']
+    assert list(df.index) == [1, 1]
+
+
+def test_sparse():
+    value_dicts = [dict(a=1, b=dict(c=0)), dict(a=2, d='x'),
+                   dict(a=1, b=dict(c=1), e=[1])]
+    dd = diff_dicts(value_dicts)
+    sparse = diff_dicts(value_dicts, sparse=True)
+    assert sparse.keys == dd.keys
+    assert str(sparse.value_df[('a',)].dtype) == 'int64'
+    assert str(sparse.value_df[('b', 'c')].dtype) == 'Sparse[int64, nan]'
+    assert str(sparse.value_df[('d',)].dtype) == 'Sparse[object, nan]'
+
+    def normalize(df):
+        return df.astype(object).where(df.notna(), None)
+
+    assert normalize(sparse.pretty_diff()).equals(normalize(dd.pretty_diff()))
+
+    sparse.add(dict(a=3), dict())
+    sparse.remove(0)
+    assert list(sparse.value_df.index) == [1, 2, 3]
+    assert sparse.value_df[('a',)].tolist() == [2, 1, 3]
+
+
+def test_diff_df_subset():
+    dd = diff_dicts([dict(a=1, b=0), dict(a=2, b=0), dict(a=3, b=0)])
+    dd.remove(0)
+    assert list(dd.diff_df.columns) == [('value', ('a',))]
+    assert list(dd.diff_df.index) == [1, 2]
+    assert dd._value_df is None  # other columns are not constructed
+
+
+def test_nullable():
+    dd = diff_dicts([dict(a=1, b=True, c=2 ** 70), dict(a=1, b=True), dict()])
+    assert str(dd.value_df[('a',)].dtype) == 'Int64'
+    assert str(dd.value_df[('b',)].dtype) == 'boolean'
+    assert str(dd.value_df[('c',)].dtype) == 'object'  # int64 overflow
+    assert dd.keys == [('a',), ('b',), ('c',)]
+
+    dd.remove(2)
+    assert dd.keys == [('c',)]
+    dd.add(dict(a=1, b=True, c=2 ** 70))
+    assert dd.keys == [('c',)]
+    assert sorted(different_keys(dd.value_df)) == [('c',)]
+
+
+@pytest.mark.parametrize('materialize', [False, True])
+def test_key_tolerances(materialize):
+    value_dicts = [dict(a=1.0, b=1.0, c=1.0), dict(a=1.01, b=1.2, c=1.0),
+                   dict(a=float('inf'), b=1.0, c=float('inf'))]
+    atol = {('a',): 0.1, None: 0.5}
+    desired = [('a',), ('c',)]
+    dd = diff_dicts(value_dicts, atol=atol)
+    if materialize:
+        dd.value_df
+        dd.add(dict(a=1.0, b=1.0, c=1.0))  # checked by the counter
+    assert dd.keys == desired
+    assert sorted(different_keys(dd.value_df, atol=atol)) == desired
+    assert diff_keys(value_dicts, atol=atol) == desired
+
+
+@pytest.mark.parametrize('blocksize', [1, 4, 2 ** 22])
+def test_different_float_keys_blocks(blocksize):
+    value_dicts = [{str(i): 1.0 for i in range(5)},
+                   {str(i): 1.0 + (i % 2) * 0.01 for i in range(5)}]
+    atol = {('3',): 0.1}
+    dd = diff_dicts(value_dicts)
+    actual = different_keys(dd.value_df, atol=atol, blocksize=blocksize)
+    assert sorted(actual) == [('1',)]
+
+
+@pytest.mark.parametrize('sparse', [False, True])
+def test_summary(sparse):
+    value_dicts = [dict(a=1, b='x', c=[1], d=True, e=0.5),
+                   dict(a=2, b='x', c=[1], d=False, e=0.5),
+                   dict(a=2, c=[2], d=True),
+                   dict(a=2, b=None, c=[1], d=True, e=1.5)]
+    dd = diff_dicts(value_dicts, sparse=sparse)
+    summary = dd.summary()
+    assert list(summary.index) == ['b', 'e', 'a', 'c', 'd']
+    assert summary.loc['a'].tolist() == [4, 0, 2, 2, 3, 1, 1, 2]
+    assert summary.loc['b'].tolist()[:6] == [3, 1, 2, 'x', 2, 2]
+    assert summary.loc['c'].tolist()[:6] == [4, 0, 2, [1], 3, 1]
+    assert summary.loc['d'].tolist()[:6] == [4, 0, 2, True, 3, 1]
+    assert summary.loc['e'].tolist() == [3, 1, 2, 0.5, 2, 2, 0.5, 1.5]
+    assert list(dd.summary(top=2).index) == ['b', 'e']
+
+    dd.remove(0)
+    summary = dd.summary()
+    assert 'a' not in summary.index
+    assert summary.loc['d'].tolist()[:6] == [3, 0, 2, True, 2, 1]
+
+
+@pytest.mark.parametrize('sparse', [False, True])
+def test_groups(sparse):
+    value_dicts = [dict(a=1, b='x', c=[1]),
+                   dict(a=2, c=[1]),
+                   dict(a=1, b='x', c=[1]),
+                   dict(b=None, c=[1]),
+                   dict(a=1, b='x', c=[1])]
+    info_dicts = [dict(path='p{}'.format(i)) for i in range(5)]
+    dd = DictsDiff(value_dicts, info_dicts, sparse=sparse)
+    groups = dd.groups(samples=2)
+    assert list(groups.columns) == ['count', 'samples', 'a', 'b']
+    assert groups['count'].tolist() == [3, 1, 1]
+    assert groups['samples'].tolist() == [['p0', 'p2'], ['p1'], ['p3']]
+    assert groups['a'].tolist()[:2] == [1, 2]
+
+    dd.remove(1)
+    assert dd.groups()['count'].tolist() == [3, 1]
+
+
+def test_groups_negative_samples():
+    with pytest.raises(ValueError):
+        diff_dicts([dict(a=1), dict(a=2)]).groups(samples=-1)
+
+
+def test_groups_name_collision():
+    groups = diff_dicts([dict(count=1), dict(count=2)]).groups()
+    assert list(groups.columns) == ['count', 'samples', 'value.count']
+
+
+def test_summary_no_keys():
+    summary = diff_dicts([dict(a=1), dict(a=1)]).summary()
+    assert len(summary) == 0
+    assert 'differ' in summary.columns
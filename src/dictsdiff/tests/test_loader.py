@@ -1,8 +1,12 @@
+import io
 import pickle
 
 import pytest
 
-from ..loader import load_any, to_info_dict, transforming_loader, LoaderError
+from ..loader import load_any, to_info_dict, transforming_loader, \
+    LoaderError, diff_files, diff_ndjson, get_json_backend, JSON_BACKENDS, \
+    YAMLShim, describe_backends, diff_ndjson_file, scan_ndjson_file_keys, \
+    diff_table_file, load_table
 
 
 def test_load_yaml(tmpdir):
@@ -12,6 +16,43 @@ def test_load_yaml(tmpdir):
     assert loaded == {'x': 1}
 
 
+def test_yaml_loader():
+    yaml = pytest.importorskip('yaml')
+    if yaml.__with_libyaml__:
+        assert YAMLShim().loader_name == 'CSafeLoader'
+    assert YAMLShim().loader_name in describe_backends()
+
+
+def test_diff_multi_document_yaml(tmpdir):
+    paramfile1 = tmpdir.join('param1.yaml')
+    paramfile1.write('x: 1\ny: 0\n---\nx: 2\ny: 0\n')
+    paramfile2 = tmpdir.join('param2.yaml')
+    paramfile2.write('x: 3\ny: 0\n')
+    with pytest.raises(LoaderError):
+        load_any(str(paramfile1))
+
+    dd = diff_files([str(paramfile1), str(paramfile2)])
+    assert dd.keys == [('x',)]
+    df = dd.pretty_diff()
+    assert list(df['x']) == [1, 2, 3]
+    assert list(df.index) == [
+        str(paramfile1) + '#0', str(paramfile1) + '#1', str(paramfile2)]
+    assert list(dd.info_df[('document',)].iloc[:2]) == [0, 1]
+
+
+def test_empty_yaml(tmpdir):
+    paramfile1 = tmpdir.join('param1.yaml')
+    paramfile1.write('')
+    paramfile2 = tmpdir.join('param2.yaml')
+    paramfile2.write('x: 1\n')
+    with pytest.raises(LoaderError) as excinfo:
+        load_any(str(paramfile1))
+    assert 'No document found' in str(excinfo.value)
+    with pytest.raises(LoaderError) as excinfo:
+        diff_files([str(paramfile1), str(paramfile2)])
+    assert 'No document found' in str(excinfo.value)
+
+
 @pytest.mark.parametrize('filename', ['param.json', 'param.unknown-ext'])
 def test_load_json(tmpdir, filename):
     paramfile = tmpdir.join(filename)
@@ -72,3 +113,317 @@ def test_transforming_loader():
     transform = 'echo \'{{"x": 1}}\''
     loaded, = transforming_loader([None], transform, 'json')
     assert loaded == {'x': 1}
+
+
+@pytest.mark.parametrize('jobs', [1, 3])
+def test_transforming_loader_jobs(jobs):
+    # Later commands finish first:
+    transform = 'sleep 0.0{0}; echo \'{{"x": {0}}}\''
+    files = list(range(9, -1, -1))
+    loaded = list(transforming_loader(files, transform, 'json', jobs=jobs))
+    assert loaded == [{'x': i} for i in files]
+
+
+@pytest.mark.parametrize('batch_size', [1, 3, 100])
+@pytest.mark.parametrize('jobs', [1, 3])
+def test_transforming_loader_batch(tmpdir, batch_size, jobs):
+    files = []
+    for i in range(10):
+        paramfile = tmpdir.join('param {}.json'.format(i))
+        paramfile.write('{{"x": {}}}'.format(i))
+        files.append(str(paramfile))
+    transform = 'for f in {files}; do cat "$f"; echo; done'
+    loaded = list(transforming_loader(files, transform, 'json', jobs=jobs,
+                                      batch_size=batch_size))
+    assert loaded == [{'x': i} for i in range(10)]
+
+
+@pytest.mark.parametrize('transform', [
+    'echo \'{{"x": 1}}\'; exit 3',
+    'exit 1',
+    'exit 1 {files}',
+    'echo 1 {files}',
+])
+@pytest.mark.parametrize('jobs', [1, 2])
+def test_transforming_loader_error(transform, jobs):
+    with pytest.raises(LoaderError) as excinfo:
+        list(transforming_loader([None, None], transform, 'json', jobs=jobs))
+    assert 'exited with status' in str(excinfo.value) or \
+        'printed 1 lines for 2 files' in str(excinfo.value)
+
+
+@pytest.mark.parametrize('batch', [False, True])
+def test_transforming_loader_large_invalid_output(tmpdir, batch):
+    import sys
+    import threading
+    # More than the pipe buffer after an invalid first line:
+    script = tmpdir.join('invalid.py')
+    script.write('print("]{")\nprint(("x" * 1000 + "\\n") * 300)\n')
+    transform = '"{}" "{}" {}'.format(sys.executable, script,
+                                      '{files}' if batch else '{}')
+    errors = []
+
+    def load():
+        try:
+            list(transforming_loader(
+                ['a'], transform, 'json' if batch else 'yaml'))
+        except Exception as err:
+            errors.append(err)
+
+    thread = threading.Thread(target=load)
+    thread.daemon = True
+    thread.start()
+    thread.join(60)
+    assert not thread.is_alive()
+    assert len(errors) == 1
+
+
+def test_transforming_loader_mixed_placeholders():
+    with pytest.raises(LoaderError) as excinfo:
+        list(transforming_loader(['a'], 'echo {} {files}', 'json'))
+    assert 'cannot be mixed' in str(excinfo.value)
+
+
+@pytest.mark.parametrize('ext, template', [
+    ('json', '{{"x": {}, "y": {{"z": 0}}}}'),
+    ('yaml', 'x: {}\ny: {{z: 0}}'),
+])
+@pytest.mark.parametrize('jobs', [2, None])
+def test_diff_files_jobs(tmpdir, ext, template, jobs):
+    files = []
+    for i in range(5):
+        paramfile = tmpdir.join('param{}.{}'.format(i, ext))
+        paramfile.write(template.format(i % 2))
+        files.append(str(paramfile))
+    serial = diff_files(files)
+    parallel = diff_files(files, jobs=jobs)
+    assert parallel.keys == serial.keys == [('x',)]
+    assert parallel.diff_df.equals(serial.diff_df)
+    pruned = diff_files(files, jobs=jobs, prune=True)
+    assert pruned.keys == serial.keys
+    assert pruned.diff_df.equals(serial.diff_df)
+
+
+NDJSON = u"""
+{"a": 1, "b": {"c": 0, "d": 0}, "e": 0, "i": "x"}
+{"a": 2, "b": {"c": 0, "d": 1}, "i": "y"}
+{"a": 1, "b": {"c": 0, "d": 1}, "e": 0, "i": "z"}
+""".strip()
+
+
+@pytest.mark.parametrize('seekable', [True, False])
+@pytest.mark.parametrize('info_keys', [[], [('i',)]])
+def test_diff_ndjson_streaming(seekable, info_keys):
+    desired = diff_ndjson(io.StringIO(NDJSON), info_keys=info_keys)
+    if seekable:
+        stream = io.StringIO(NDJSON)
+    else:
+        stream = iter(io.StringIO(NDJSON))
+    actual = diff_ndjson(stream, streaming=True, info_keys=info_keys)
+    assert actual.keys == desired.keys
+    assert list(actual.value_df.columns) == actual.keys
+    assert actual.pretty_diff().equals(desired.pretty_diff())
+
+
+@pytest.mark.parametrize('jobs', [1, 2])
+@pytest.mark.parametrize('info_keys', [[], [('i',)]])
+def test_diff_ndjson_file(tmpdir, jobs, info_keys):
+    ndjson = tmpdir.join('param.ndjson')
+    ndjson.write('\n'.join([NDJSON] * 5) + '\n\n')
+    desired = diff_ndjson(io.StringIO(ndjson.read()), info_keys=info_keys)
+    actual = diff_ndjson_file(str(ndjson), jobs=jobs, info_keys=info_keys)
+    assert actual.keys == desired.keys
+    assert actual.pretty_diff().equals(desired.pretty_diff())
+
+    tracker = scan_ndjson_file_keys(str(ndjson), jobs=jobs,
+                                    info_keys=info_keys)
+    assert sorted(tracker.keys) == desired.keys
+    assert tracker.count == 15
+
+
+def test_diff_ndjson_streaming_no_diff():
+    ndjson = u'{"a": 1}\n{"a": 1}\n'
+    dd = diff_ndjson(iter(io.StringIO(ndjson)), streaming=True)
+    assert dd.keys == []
+    assert len(dd.pretty_diff()) == 2
+
+
+@pytest.mark.parametrize('name', JSON_BACKENDS)
+def test_json_backend(tmpdir, name):
+    pytest.importorskip(name)
+    paramfile = tmpdir.join('param.json')
+    paramfile.write('{"x": {"y": [1, 2.5, null, "z"]}, "w": NaN}')
+    loaded = load_any(str(paramfile), json_backend=name)
+    assert loaded['x'] == {'y': [1, 2.5, None, 'z']}
+    assert loaded['w'] != loaded['w']  # NaN via fallback to json
+
+    ndjson = b'{"a": 1, "b": 2}\n{"a": 1, "b": 3}\n'
+    dd = diff_ndjson(io.BytesIO(ndjson), json_backend=name)
+    assert dd.keys == [('b',)]
+
+
+@pytest.mark.parametrize('name', ['auto'] + list(JSON_BACKENDS))
+def test_json_backend_long_integer(tmpdir, name):
+    if name != 'auto':
+        pytest.importorskip(name)
+    files = []
+    for i in range(2):
+        paramfile = tmpdir.join('param{}.json'.format(i))
+        paramfile.write('{{"id": 12345678901234567890123456789{}}}'.format(i))
+        files.append(str(paramfile))
+    dd = diff_files(files, json_backend=name)
+    assert dd.keys == [('id',)]
+    assert load_any(files[0], json_backend=name)['id'] == \
+        123456789012345678901234567890
+
+    ndjson = (b'{"a": 10000000000000000000001}\n'
+              b'{"a": 10000000000000000000002}\n')
+    dd = diff_ndjson(io.BytesIO(ndjson), json_backend=name)
+    assert dd.keys == [('a',)]
+
+
+def test_unknown_json_backend():
+    with pytest.raises(LoaderError):
+        get_json_backend('no-such-backend')
+
+
+@pytest.mark.parametrize('cache', [False, True])
+def test_diff_files_parse_once(tmpdir, monkeypatch, cache):
+    from .. import loader
+    paramfile = tmpdir.join('param.json')
+    paramfile.write('{"a": {"x": 1}, "b": {"x": 2}, "c": {"x": 1}}')
+    otherfile = tmpdir.join('other.json')
+    otherfile.write('{"x": 3}')
+    files = [(str(paramfile), '$.a'), str(otherfile),
+             (str(paramfile), '$.b'), (str(paramfile), '$.c')]
+
+    loaded = []
+    load_documents = loader.load_documents
+    monkeypatch.setattr(loader, 'load_documents',
+                        lambda path, *args: loaded.append(path) or
+                        load_documents(path, *args))
+    dd = diff_files(files, cache=str(tmpdir.join('cache')) if cache else None)
+    assert sorted(loaded) == sorted([str(paramfile), str(otherfile)])
+    assert list(dd.pretty_diff()['x']) == [1, 3, 2, 1]
+    assert list(dd.info_df[('path',)]) == [
+        str(paramfile) + ' $.a', str(otherfile),
+        str(paramfile) + ' $.b', str(paramfile) + ' $.c',
+    ]
+
+
+def test_compile_jspath():
+    from ..loader import compile_jspath
+    assert compile_jspath('$.a') is compile_jspath('$.a')
+
+
+@pytest.mark.parametrize('cache', [False, True])
+def test_diff_files_expand(tmpdir, cache):
+    paramfile = tmpdir.join('param.json')
+    paramfile.write('{"runs": [{"x": 1, "y": 0}, {"x": 2, "y": 0}]}')
+    files = [(str(paramfile), '$.runs[*]')]
+    cache = str(tmpdir.join('cache')) if cache else None
+    for _ in range(2):  # 2nd iteration uses cache (if enabled)
+        with pytest.raises(LoaderError) as excinfo:
+            diff_files(files, cache=cache)
+        assert 'Multiple objects found' in str(excinfo.value)
+
+        dd = diff_files(files, cache=cache, expand=True)
+        assert dd.keys == [('x',)]
+        assert list(dd.info_df[('path',)]) == [
+            str(paramfile) + ' $.runs[0]',
+            str(paramfile) + ' $.runs[1]',
+        ]
+        assert list(dd.info_df[('match',)]) == ['$.runs[0]', '$.runs[1]']
+
+
+def test_diff_files_expand_no_match(tmpdir):
+    paramfile = tmpdir.join('param.json')
+    paramfile.write('{"runs": []}')
+    with pytest.raises(LoaderError) as excinfo:
+        diff_files([(str(paramfile), '$.runs[*]')], expand=True)
+    assert 'No object found' in str(excinfo.value)
+
+
+@pytest.mark.parametrize('sep', [',', '\t'])
+def test_load_table_csv(tmpdir, sep):
+    path = tmpdir.join('records.' + ('csv' if sep == ',' else 'tsv'))
+    path.write('\n'.join(sep.join(row) for row in [
+        ['a', 'b.c', 'b.d', 'e'],
+        ['1', '0.5', 'x', 'true'],
+        ['2', '', 'y', 'false'],
+    ]) + '\n')
+    values = load_table(str(path))
+    assert values.nrows == 2
+    assert values.row(0) == {('a',): 1, ('b', 'c'): 0.5, ('b', 'd'): 'x',
+                             ('e',): True}
+    assert values.row(1) == {('a',): 2, ('b', 'd'): 'y', ('e',): False}
+    assert type(values.row(0)[('a',)]) is int
+
+    values = load_table(str(path), columns=[('b',)])
+    assert values.keys == [('b', 'c'), ('b', 'd')]
+
+    dd = diff_table_file(str(path), columns=[('b', 'c')], info_keys=[('a',)])
+    assert dd.keys == [('b', 'c')]
+    assert list(dd.pretty_diff().index) == [1, 2]
+
+
+def test_load_table_csv_missing(tmpdir):
+    path = tmpdir.join('records.csv')
+    path.write('a,b,c,d\n1,,1.0,\n,2,2.0,\n')
+    values = load_table(str(path))
+    assert values.keys == [('a',), ('b',), ('c',)]  # no all-null 'd'
+    assert values.row(0) == {('a',): 1, ('c',): 1.0}
+    assert values.row(1) == {('b',): 2, ('c',): 2.0}
+    assert type(values.row(0)[('a',)]) is int
+    assert type(values.row(0)[('c',)]) is float
+
+
+def test_load_table_unknown(tmpdir):
+    with pytest.raises(LoaderError):
+        load_table(str(tmpdir.join('records.txt')))
+
+
+@pytest.mark.parametrize('format', ['parquet', 'arrow'])
+def test_load_table_arrow(tmpdir, format):
+    pyarrow = pytest.importorskip('pyarrow')
+    import pyarrow.feather
+    import pyarrow.parquet
+    table = pyarrow.table({
+        'a': [1, 1],
+        'b': [{'c': 0, 'd': [1]}, {'c': None, 'd': [2]}],
+        'e': pyarrow.array([None, None], type=pyarrow.int64()),
+    })
+    path = str(tmpdir.join('records.' + format))
+    if format == 'parquet':
+        pyarrow.parquet.write_table(table, path)
+    else:
+        pyarrow.feather.write_feather(table, path)
+    values = load_table(path)
+    assert values.row(0) == {('a',): 1, ('b', 'c'): 0, ('b', 'd'): [1]}
+    assert values.row(1) == {('a',): 1, ('b', 'd'): [2]}
+    assert load_table(path, columns=[('b', 'd')]).keys == [('b', 'd')]
+    assert diff_table_file(path).keys == [('b', 'c'), ('b', 'd')]
+
+
+@pytest.mark.parametrize('format', ['parquet', 'arrow'])
+def test_load_table_arrow_dotted_names(tmpdir, format):
+    pyarrow = pytest.importorskip('pyarrow')
+    import pyarrow.feather
+    import pyarrow.parquet
+    table = pyarrow.table({
+        'a': [1, 2],
+        'b.c': [0, 1],
+        'b.d': ['x', 'x'],
+        'e': [{'f': 0}, {'f': 1}],
+    })
+    path = str(tmpdir.join('records.' + format))
+    if format == 'parquet':
+        pyarrow.parquet.write_table(table, path)
+    else:
+        pyarrow.feather.write_feather(table, path)
+    assert load_table(path, columns=[('b', 'c')]).keys == [('b', 'c')]
+    assert load_table(path, columns=[('b',)]).keys == \
+        [('b', 'c'), ('b', 'd')]
+    assert load_table(path, columns=[('e', 'f'), ('a',)]).keys == \
+        [('a',), ('e', 'f')]
+    assert load_table(path, columns=[('g',)]).keys == []
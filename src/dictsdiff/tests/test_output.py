@@ -0,0 +1,65 @@
+import io
+
+import pandas
+import pytest
+
+from ..output import write_table
+
+
+def pandas_table(df, width=None):
+    text = df.to_string(line_width=width)
+    return '\n'.join(line.rstrip() for line in text.splitlines()) + '\n'
+
+
+def written_table(df, **kwds):
+    file = io.StringIO()
+    write_table(df, file, **kwds)
+    return '\n'.join(line.rstrip() for line in file.getvalue().splitlines()) \
+        + '\n'
+
+
+@pytest.mark.parametrize('df', [
+    pandas.DataFrame({'a': [1, 2, 3], 'b.c': ['x', None, 'long value']}),
+    pandas.DataFrame({'a': pandas.array([1, None, 3], dtype='Int64')},
+                     index=pandas.Index(['0.json', '1.json', '2.json'],
+                                        name='path')),
+    pandas.DataFrame({'a': [1, 2], 'b': [[1], [2, 3]]}).T,
+    pandas.DataFrame({'value': [True, False]},
+                     index=pandas.MultiIndex.from_tuples(
+                         [('x', 10), ('yy', 2)], names=['k', 'n'])),
+    pandas.DataFrame({'v': [1, 2, 'long'], 'w': [True, False, None]},
+                     index=pandas.MultiIndex.from_tuples(
+                         [(1, 'x'), (2, 'yy'), (2, float('nan'))],
+                         names=['a', 's'])).T,
+    pandas.DataFrame({'v': [1, 2]},
+                     index=pandas.MultiIndex.from_tuples(
+                         [('x', 1), ('x', 2)], names=[None, 'long name'])).T,
+])
+@pytest.mark.parametrize('cells', [1, 2 ** 16])
+def test_write_table_like_pandas(df, cells):
+    assert written_table(df, cells=cells) == pandas_table(df)
+
+
+def test_write_table_wrap():
+    df = pandas.DataFrame({'column{}'.format(i): [i, i * 10]
+                           for i in range(8)})
+    assert written_table(df, width=40) == pandas_table(df, width=40)
+
+
+def test_write_table_wrap_multi_level():
+    df = pandas.DataFrame(
+        [[i, i * 10] for i in range(4)],
+        index=pandas.MultiIndex.from_tuples(
+            [(0, 'x'), (0, 'y'), (1, 'x'), (1, 'long')], names=['a', 's']),
+        columns=['p', 'q']).T
+    assert written_table(df, width=16) == """\
+a  0       1  \\
+s  x   y   x
+p  0   1   2
+q  0  10  20
+
+a
+s  long
+p     3
+q    30
+"""